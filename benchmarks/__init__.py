@@ -0,0 +1,4 @@
+# Benchmarks for onpageseo.py. corpus.py writes a deterministic synthetic
+# Markdown corpus and bench.py times the analysis and the command line on it.
+#
+# Usage: python -m benchmarks.bench [--save-baseline FILE] [--baseline FILE]
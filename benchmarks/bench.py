@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+# Times onpageseo.py on synthetic corpora written by corpus.py: in-process
+# throughput, peak memory, the time spent in each analysis stage and the end to
+# end command line. Results can be stored as a baseline and later runs compared
+# against it, failing when a metric is worse than the threshold allows.
+#
+# Usage: python -m benchmarks.bench [--scenario NAME] [--save-baseline FILE]
+#                                   [--baseline FILE] [--threshold 0.15]
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import onpageseo  # noqa: E402
+from benchmarks.corpus import KEYWORDS, DocumentSpec, write_corpus  # noqa: E402
+
+DOMAIN = 'example.com'
+
+# Name, document shape and number of documents. Fewer documents are used as they
+# get longer so every scenario takes a similar amount of time.
+SCENARIOS = [
+    ('short-fm', DocumentSpec(300, 3, 1, 3, 'flat'), 200),
+    ('short-no-fm', DocumentSpec(300, 3, 1, 3, 'none'), 200),
+    ('medium-nested-fm', DocumentSpec(2000, 6, 5, 10, 'nested'), 50),
+    ('long-fm', DocumentSpec(20000, 4, 20, 50, 'flat'), 5),
+    ('huge-no-fm', DocumentSpec(100000, 6, 50, 200, 'none'), 2),
+]
+
+# Metric -> True when a higher value is better.
+METRICS = {
+    'docs_per_sec': True,
+    'mb_per_sec': True,
+    'peak_kib': False,
+    'cli_docs_per_sec': True,
+    'cli_max_rss_kib': False,
+}
+
+
+def analysis_options(spec):
+    if spec.front_matter == 'none':
+        return {'focus_keyword': KEYWORDS[0], 'keywords': KEYWORDS[1:]}
+    return {'kw_lookup': 'tags', 'desc_lookup': 'summary'}
+
+
+def cli_arguments(spec):
+    if spec.front_matter == 'none':
+        return ['no_fm', KEYWORDS[0], '-k', ', '.join(KEYWORDS[1:])]
+    return ['fm', 'tags', '-dl', 'summary']
+
+
+def time_analysis(analyzer, texts, options, repeat):
+    # Best of repeat passes over every document, so a busy moment on the machine
+    # does not count against the code.
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            analyzer.analyze(text, DOMAIN, **options)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(analyzer, texts, options):
+    tracemalloc.start()
+    try:
+        for text in texts:
+            analyzer.analyze(text, DOMAIN, **options)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stage_times(analyzer, paths, texts, options):
+    # Mean seconds per document in each stage. Tracing allocations slows every
+    # stage down, so these are for comparing stages, not for absolute timings.
+    summary = onpageseo.SiteSummary()
+    try:
+        for path, text in zip(paths, texts):
+            profiler = onpageseo.Profiler()
+            analyzer.analyze(text, DOMAIN, profiler=profiler, **options)
+            summary.add_profile(path, profiler.to_dict())
+    finally:
+        tracemalloc.stop()
+    return {name: totals['seconds'] / len(paths)
+            for name, totals in summary.profile_to_dict()['phases'].items()}
+
+
+def time_cli(directory, spec, backend, repeat):
+    # Best wall time of the command line on the whole corpus with one process and
+    # no cache, and the largest resident set size it reached.
+    command = [sys.executable, os.path.join(ROOT, 'onpageseo.py'), '--no-cache', '-w', '1',
+               '-b', backend, '-f', 'ndjson', directory, DOMAIN] + cli_arguments(spec)
+    best = None
+    max_rss = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        stderr = process.stderr.read()
+        pid, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.stderr.close()
+        if os.waitstatus_to_exitcode(status) != 0:
+            raise RuntimeError('The command line failed: ' + stderr.decode('utf-8', 'replace'))
+        best = elapsed if best is None else min(best, elapsed)
+        # ru_maxrss is in KiB on Linux.
+        max_rss = max(max_rss, usage.ru_maxrss)
+    return best, max_rss
+
+
+def run_scenario(name, spec, docs, backend, repeat, seed):
+    with tempfile.TemporaryDirectory(prefix='onpageseo-bench-') as directory:
+        paths = write_corpus(directory, spec, docs, seed)
+        texts = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as input_file:
+                texts.append(input_file.read())
+        total_bytes = sum(len(text.encode('utf-8')) for text in texts)
+        options = analysis_options(spec)
+        analyzer = onpageseo.Analyzer(backend)
+        # Warm up the analyzer and the keyword matcher cache.
+        analyzer.analyze(texts[0], DOMAIN, **options)
+
+        seconds = time_analysis(analyzer, texts, options, repeat)
+        peak = peak_memory(analyzer, texts, options)
+        stages = stage_times(analyzer, paths, texts, options)
+        cli_seconds, cli_max_rss = time_cli(directory, spec, backend, repeat)
+
+    return {
+        'spec': spec.to_dict(),
+        'docs': docs,
+        'bytes': total_bytes,
+        'seconds': seconds,
+        'docs_per_sec': docs / seconds,
+        'mb_per_sec': total_bytes / 1e6 / seconds,
+        'peak_kib': peak / 1024,
+        'stage_seconds_per_doc': stages,
+        'cli_seconds': cli_seconds,
+        'cli_docs_per_sec': docs / cli_seconds,
+        'cli_max_rss_kib': cli_max_rss,
+    }
+
+
+def compare(results, baseline, threshold):
+    # Returns (scenario, metric, baseline value, value, change, regressed) rows for
+    # every metric the baseline also has.
+    rows = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if not previous.get(metric):
+                continue
+            change = result[metric] / previous[metric] - 1
+            regressed = -change > threshold if higher_is_better else change > threshold
+            rows.append((name, metric, previous[metric], result[metric], change, regressed))
+    return rows
+
+
+def print_results(results):
+    print(f'{"Scenario":<20}{"Docs":>6}{"Docs/s":>10}{"MB/s":>8}{"Peak KiB":>11}'
+          f'{"CLI docs/s":>12}{"CLI RSS KiB":>13}')
+    for name, result in results.items():
+        print(f'{name:<20}{result["docs"]:>6}{result["docs_per_sec"]:>10.1f}'
+              f'{result["mb_per_sec"]:>8.2f}{result["peak_kib"]:>11.0f}'
+              f'{result["cli_docs_per_sec"]:>12.1f}{result["cli_max_rss_kib"]:>13}')
+    print('\nMean milliseconds per document in each stage (allocations traced)')
+    for name, result in results.items():
+        stages = ', '.join(f'{stage} {seconds * 1000:.2f}'
+                           for stage, seconds in result['stage_seconds_per_doc'].items())
+        print(f'{name}: {stages}')
+
+
+def print_comparison(rows, threshold):
+    print(f'\nCompared with the baseline (threshold {threshold:.0%})')
+    print(f'{"Scenario":<20}{"Metric":<18}{"Baseline":>12}{"Now":>12}{"Change":>9}')
+    for name, metric, previous, value, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{name:<20}{metric:<18}{previous:>12.1f}{value:>12.1f}{change:>+9.1%}{flag}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmarks onpageseo.py on a synthetic Markdown corpus.')
+    parser.add_argument('--scenario', action='append', choices=[name for name, spec, docs in SCENARIOS], help='Only run this scenario. Can be repeated. Default: all of them.')
+    parser.add_argument('-b', '--backend', choices=['tree', 'soup'], default='tree', help='Analysis backend to benchmark. Default: tree.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed passes per measurement; the fastest is kept. Default: 3.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the corpus generator. Default: 0.')
+    parser.add_argument('--output', help='Also write the results as JSON to this file.')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Store the results as the baseline later runs are compared with.')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare with a stored baseline and exit with status 1 if a metric regressed.')
+    parser.add_argument('--threshold', type=float, default=0.15, help='Relative change that counts as a regression. Default: 0.15 (15%%).')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, spec, docs in SCENARIOS:
+        if args.scenario and name not in args.scenario:
+            continue
+        print('Running ' + name + '...', file=sys.stderr, flush=True)
+        results[name] = run_scenario(name, spec, docs, args.backend, max(1, args.repeat), args.seed)
+
+    report = {'version': onpageseo.__version__, 'python': platform.python_version(),
+              'machine': platform.machine(), 'backend': args.backend, 'seed': args.seed,
+              'results': results}
+    print_results(results)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as output_file:
+                json.dump(report, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('backend', 'tree') != args.backend or baseline.get('seed', 0) != args.seed:
+            parser.error('the baseline was recorded with another backend or seed')
+        rows = compare(results, baseline, args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
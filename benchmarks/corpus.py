@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+# Writes a synthetic Markdown corpus for benchmarking. The same seed and settings
+# always produce the same files, byte for byte, so timings from different runs and
+# machines are measured on the same input.
+#
+# Usage: python -m benchmarks.corpus DIRECTORY [--docs 100] [--words 300] ...
+
+import argparse
+import os
+import random
+
+# The focus keyword and secondary keywords of every generated document.
+KEYWORDS = ['markdown seo', 'static site', 'keyword density']
+
+WORDS = (
+    'the a of and to in is for on with that as by this from it at be are or an '
+    'content page search engine readers title description heading image link '
+    'article post site build template theme publish draft review check guide '
+    'python markdown static generator html tag text paragraph list section '
+    'structure ranking traffic visitor query result snippet index crawl url '
+    'internal external source reference example sample test value field data '
+    'write read update improve optimize measure report tool script option file'
+).split()
+
+FRONT_MATTER_SHAPES = ['none', 'flat', 'nested']
+
+
+class DocumentSpec:
+    # The shape of one generated document. heading_depth is the deepest heading
+    # level used (2 - 6) and front_matter one of FRONT_MATTER_SHAPES: 'none' for
+    # the no_fm mode, 'flat' for one line per field and 'nested' for multi-line
+    # fields with extra fields the analysis does not read.
+    def __init__(self, words=300, heading_depth=3, images=2, links=4,
+                 front_matter='flat'):
+        if front_matter not in FRONT_MATTER_SHAPES:
+            raise ValueError(f'Unknown front matter shape "{front_matter}".')
+        self.words = words
+        self.heading_depth = max(2, min(6, heading_depth))
+        self.images = images
+        self.links = links
+        self.front_matter = front_matter
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def sentence(rng, length):
+    words = [rng.choice(WORDS) for _ in range(length)]
+    # About one sentence in four uses a keyword, which keeps the density near 1%.
+    if rng.random() < 0.25:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(KEYWORDS))
+    return ' '.join(words).capitalize() + '.'
+
+
+def paragraph(rng, words):
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 20))
+        sentences.append(sentence(rng, length))
+        words -= length
+    return ' '.join(sentences)
+
+
+def front_matter(rng, spec, title):
+    if spec.front_matter == 'none':
+        return ''
+    summary = paragraph(rng, 20)
+    if spec.front_matter == 'flat':
+        return (f'Title: {title}\nSummary: {summary}\n'
+                f'Tags: {", ".join(KEYWORDS)}\n\n')
+    lines = [f'Title: {title}', 'Summary: ' + summary, 'Tags: ' + KEYWORDS[0]]
+    lines += ['    ' + keyword for keyword in KEYWORDS[1:]]
+    lines += ['Date: 2021-0' + str(rng.randint(1, 9)) + '-1' + str(rng.randint(0, 9)),
+              'Authors: ' + rng.choice(WORDS), '    ' + rng.choice(WORDS),
+              'Category: ' + rng.choice(WORDS)]
+    return '\n'.join(lines) + '\n\n'
+
+
+def generate_document(rng, spec):
+    title = sentence(rng, 6)[:-1]
+    parts = [front_matter(rng, spec, title), '# ' + title, '']
+    # Paragraphs of 40 - 120 words, with a heading, image or link placed between
+    # them until each has been used as often as the spec asks.
+    remaining = spec.words
+    images, links = spec.images, spec.links
+    level = 2
+    while remaining > 0:
+        words = min(remaining, rng.randint(40, 120))
+        remaining -= words
+        text = paragraph(rng, words)
+        if links:
+            links -= 1
+            domain = 'example.com' if links % 2 else 'example.org'
+            text += f' See [{rng.choice(WORDS)} {rng.choice(KEYWORDS)}](https://{domain}/{rng.choice(WORDS)}/).'
+        parts += [text, '']
+        if images:
+            images -= 1
+            alt = rng.choice(KEYWORDS) if rng.random() < 0.5 else rng.choice(WORDS)
+            parts += [f'![{alt}](/images/{rng.choice(WORDS)}-{images}.png)', '']
+        if rng.random() < 0.3:
+            parts += ['#' * level + ' ' + sentence(rng, 4)[:-1], '']
+            level = level + 1 if level < spec.heading_depth else 2
+        if rng.random() < 0.1:
+            parts += ['- ' + sentence(rng, 6) for _ in range(3)] + ['']
+    # Anything not placed yet goes at the end.
+    parts += [f'![{rng.choice(WORDS)}](/images/extra-{i}.png)' for i in range(images)]
+    parts += [f'[{rng.choice(WORDS)}](https://example.com/extra-{i}/)' for i in range(links)]
+    return '\n'.join(parts) + '\n'
+
+
+def write_corpus(directory, spec, docs, seed=0):
+    # Returns the paths of the files written.
+    rng = random.Random(f'{seed}:{sorted(spec.to_dict().items())}')
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for number in range(docs):
+        path = os.path.join(directory, f'doc-{number:05d}.md')
+        with open(path, 'w', encoding='utf-8') as output_file:
+            output_file.write(generate_document(rng, spec))
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Writes a deterministic synthetic Markdown corpus.')
+    parser.add_argument('directory', help='Where the Markdown files are written.')
+    parser.add_argument('--docs', type=int, default=100, help='Number of documents. Default: 100.')
+    parser.add_argument('--words', type=int, default=300, help='Words of body text per document. Default: 300.')
+    parser.add_argument('--heading-depth', type=int, default=3, help='Deepest heading level used, 2 - 6. Default: 3.')
+    parser.add_argument('--images', type=int, default=2, help='Images per document. Default: 2.')
+    parser.add_argument('--links', type=int, default=4, help='Links per document. Default: 4.')
+    parser.add_argument('--front-matter', choices=FRONT_MATTER_SHAPES, default='flat', help='"none" for documents checked with no_fm, "flat" or "nested" for fm. Default: flat.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed. Default: 0.')
+    args = parser.parse_args(argv)
+
+    spec = DocumentSpec(args.words, args.heading_depth, args.images, args.links,
+                        args.front_matter)
+    paths = write_corpus(args.directory, spec, args.docs, args.seed)
+    print('Wrote ' + str(len(paths)) + ' document(s) to ' + args.directory + '.')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,54 @@
 #!/usr/bin/env python3
 
 import argparse
+import array
+import base64
+import contextlib
+import copy
+import functools
+import glob
+import hashlib
+import heapq
+import io
+import ipaddress
+import itertools
+import json
 import markdown
+import mmap
+import os
+import posixpath
+import random
 import re
-from bs4 import BeautifulSoup
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.parse
+import xml.etree.ElementTree as etree
+import zlib
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from html import escape as escape_html, unescape as unescape_html
+from markdown.extensions import Extension
+from markdown.serializers import to_xhtml_string
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import AMP_SUBSTITUTE, BLOCK_LEVEL_ELEMENTS, HTML_PLACEHOLDER_RE, STX, ETX
+
+# BeautifulSoup is only needed for the 'soup' analysis backend.
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+__version__ = '0.7.2'
+
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
 
 
 class bcolors:
@@ -13,6 +58,2160 @@ class bcolors:
     RESET = '\033[0m'  # RESET COLOR
 
 
+class Content:
+    # Everything the report needs from a converted document: the text of each
+    # paragraph, heading text by level, the text of each list item, images and links.
+    def __init__(self):
+        self.paragraphs = []
+        self.headings = {level: [] for level in range(1, 7)}
+        self.list_items = []
+        self.images = []
+        self.links = []
+
+    def text_units(self):
+        return itertools.chain(self.paragraphs, *self.headings.values(), self.list_items)
+
+
+class Profiler:
+    # Records the wall time, allocation peak and number of elements visited for
+    # each phase of analyzing a document. Phases may be nested, for example the
+    # tree walk inside Python-Markdown's conversion; the time and elements of a
+    # nested phase are not counted again in the phase around it. Allocations are
+    # traced with tracemalloc, which is started on first use.
+    def __init__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.phases = []
+        self.stack = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        record = {'phase': name, 'seconds': 0.0, 'peak_bytes': 0, 'elements': 0}
+        if self.stack:
+            parent = self.stack[-1]
+            parent['peak'] = max(parent['peak'], tracemalloc.get_traced_memory()[1])
+        reset_peak()
+        frame = {'record': record, 'start_memory': tracemalloc.get_traced_memory()[0],
+                 'peak': 0, 'child_seconds': 0.0}
+        self.stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stack.pop()
+            frame['peak'] = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            record['seconds'] = elapsed - frame['child_seconds']
+            record['peak_bytes'] = max(0, frame['peak'] - frame['start_memory'])
+            if self.stack:
+                parent = self.stack[-1]
+                parent['child_seconds'] += elapsed
+                parent['peak'] = max(parent['peak'], frame['peak'])
+            self.phases.append(record)
+
+    def to_dict(self):
+        # A phase run more than once, such as Convert for each block of a streamed
+        # document, is reported once with its totals and largest peak.
+        phases = {}
+        for record in self.phases:
+            total = phases.setdefault(record['phase'], dict(record, seconds=0.0, elements=0))
+            total['seconds'] += record['seconds']
+            total['elements'] += record['elements']
+            total['peak_bytes'] = max(total['peak_bytes'], record['peak_bytes'])
+        return {'seconds': sum(record['seconds'] for record in self.phases),
+                'phases': sorted(phases.values(), key=lambda record: phase_order(record['phase']))}
+
+
+class NullProfiler:
+    # Stands in for a Profiler when profiling is off, so the phases cost nothing.
+    @contextlib.contextmanager
+    def phase(self, name):
+        yield {}
+
+    def to_dict(self):
+        return None
+
+
+def phase_order(name):
+    # Phases of checks that are not built in come last.
+    return PROFILE_PHASES.index(name) if name in PROFILE_PHASES else len(PROFILE_PHASES)
+
+
+def reset_peak():
+    # tracemalloc.reset_peak() was added in Python 3.9.
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+
+
+PROFILE_PHASES = ['Read', 'Convert', 'Parse', 'Title', 'Meta Description', 'Word Count',
+                  'Keyword Count & Density', 'Images', 'Links', 'Content Structure',
+                  'Readability', 'Fingerprint']
+NULL_PROFILER = NullProfiler()
+
+
+ESCAPED_CHARACTER_RE = re.compile(STX + r'(\d+)' + ETX)
+HTML_TAG_RE = re.compile(r'<[^>]*>')
+# The entities Python-Markdown's serializer writes out as they are instead of
+# escaping their '&'.
+SERIALIZED_ENTITY_RE = re.compile(r'&(?:#[0-9]+|#x[0-9a-f]+|[0-9a-z]+);', re.IGNORECASE)
+HEADING_LEVELS = {'h' + str(level): level for level in range(1, 7)}
+# Children of a list item whose text does not belong to the item itself: paragraphs
+# of a loose list are counted as paragraphs and nested lists have items of their own.
+LIST_ITEM_BLOCKS = {'p', 'ul', 'ol', 'pre', 'blockquote', 'div', 'table'} | set(HEADING_LEVELS)
+# The features of a document a check can ask for and the tags they are read from.
+# 'tokens' are the words of the paragraphs, plus headings and list items when
+# counting everything, and 'sentences' the sentences of the paragraphs (see
+# feature_tags()).
+FEATURE_TAGS = {
+    'paragraphs': {'p'},
+    'headings': set(HEADING_LEVELS),
+    'list_items': {'li'},
+    'images': {'img'},
+    'links': {'a'},
+}
+ALL_TAGS = set().union(*FEATURE_TAGS.values())
+
+
+class ContentTreeprocessor(Treeprocessor):
+    # Collects the Content of a document in a single walk over the ElementTree
+    # built by Python-Markdown. It runs after the inline patterns have been applied
+    # and then hands back an empty root so the document is never serialized. Only
+    # the elements in tags are collected.
+    profiler = NULL_PROFILER
+    tags = ALL_TAGS
+
+    def run(self, root):
+        self.content = Content()
+        with self.profiler.phase('Parse') as record:
+            elements = 0
+            for element in root.iter():
+                if element is not root:
+                    if element.tag in self.tags:
+                        self.collect(element)
+                    elements += 1
+            record['elements'] = elements
+        return etree.Element('div')
+
+    def collect(self, element):
+        content = self.content
+        tag = element.tag
+        if tag == 'p':
+            if HTML_PLACEHOLDER_RE.fullmatch(element.text or '') and not len(element):
+                # A raw HTML block, which the soup backend does not see as a paragraph.
+                return
+            content.paragraphs.append(self.get_text(element))
+        elif tag in HEADING_LEVELS:
+            content.headings[HEADING_LEVELS[tag]].append(self.get_text(element))
+        elif tag == 'li':
+            parts = [element.text or '']
+            for child in element:
+                if child.tag not in LIST_ITEM_BLOCKS:
+                    parts.extend(child.itertext())
+                parts.append(child.tail or '')
+            list_item = self.unescape(''.join(parts))
+            if list_item.strip():
+                content.list_items.append(list_item)
+        elif tag == 'img':
+            content.images.append({
+                'src': self.unescape(element.get('src', '')),
+                'alt': self.unescape(element.get('alt', '')),
+                'html': self.to_html(element),
+            })
+        elif tag == 'a':
+            content.links.append({
+                'href': self.unescape(element.get('href', '')),
+                'text': self.get_text(element),
+                'html': self.to_html(element),
+            })
+
+    def get_text(self, element):
+        return self.unescape(''.join(element.itertext()))
+
+    def to_html(self, element):
+        element = copy.copy(element)
+        element.tail = None
+        html = to_xhtml_string(element)
+        if STX in html:
+            html = html.replace(AMP_SUBSTITUTE, '&')
+            html = HTML_PLACEHOLDER_RE.sub(self.raw_html, html)
+            html = ESCAPED_CHARACTER_RE.sub(
+                lambda m: escape_html(chr(int(m.group(1))), quote=False), html)
+        if html.endswith(' />'):
+            html = html[:-3] + '/>'
+        return html
+
+    def unescape(self, text):
+        # Returns text as it reads on the page. The entities the serializer leaves
+        # alone are decoded, which covers the escaped text of code spans, then the
+        # characters and inline raw HTML that Python-Markdown keeps as placeholders
+        # until its postprocessors run are restored.
+        if STX in text:
+            text = text.replace(AMP_SUBSTITUTE, '&')
+        if '&' in text:
+            text = SERIALIZED_ENTITY_RE.sub(lambda m: unescape_html(m.group()), text)
+        if STX in text:
+            text = HTML_PLACEHOLDER_RE.sub(self.unstash, text)
+            text = ESCAPED_CHARACTER_RE.sub(lambda m: chr(int(m.group(1))), text)
+        return text
+
+    def raw_html(self, match):
+        return str(self.md.htmlStash.rawHtmlBlocks[int(match.group(1))])
+
+    def unstash(self, match):
+        # Entities, such as '&amp;', are kept as raw HTML as well.
+        return unescape_html(HTML_TAG_RE.sub('', self.raw_html(match)))
+
+
+class ContentExtension(Extension):
+    def extendMarkdown(self, md):
+        # After 'inline' (20) so links and images exist, before 'prettify' (10).
+        md.treeprocessors.register(ContentTreeprocessor(md), 'content', 15)
+
+
+def soup_content(html, profiler=NULL_PROFILER, tags=ALL_TAGS):
+    # Fallback backend: parse the serialized HTML with BeautifulSoup. Slower, but
+    # it also sees links and images written as raw HTML inside the Markdown.
+    with profiler.phase('Parse') as record:
+        post = BeautifulSoup(html, 'html.parser')
+        if record:
+            # Each find_all() below is a pass over every element. Only counted when
+            # profiling, as counting is another pass.
+            record['elements'] = len(post.find_all(True)) * len(tags)
+        content = Content()
+        if 'p' in tags:
+            content.paragraphs = [p.get_text() for p in post.find_all('p')]
+        for level in range(1, 7):
+            if 'h' + str(level) in tags:
+                content.headings[level] = [h.get_text()
+                                           for h in post.find_all('h' + str(level))]
+        for li in post.find_all('li') if 'li' in tags else []:
+            parts = []
+            for child in li.children:
+                if child.name is None:
+                    parts.append(str(child))
+                elif child.name not in LIST_ITEM_BLOCKS:
+                    parts.append(child.get_text())
+            list_item = ''.join(parts)
+            if list_item.strip():
+                content.list_items.append(list_item)
+        if 'img' in tags:
+            content.images = [{'src': img.get('src') or '', 'alt': img.get('alt') or '',
+                               'html': str(img)} for img in post.find_all('img')]
+        if 'a' in tags:
+            content.links = [{'href': a.get('href') or '', 'text': a.get_text(),
+                              'html': str(a)} for a in post.find_all('a')]
+    return content
+
+
+class KeywordMatcher:
+    # Finds every keyword in a text with one scan of a single compiled regular
+    # expression. Keywords are matched literally, so 'c++' and 'node.js' are safe.
+    # The alternation sits inside a lookahead so a match is tried at every position,
+    # and keywords that are a prefix of the one matched there (for example 'python'
+    # inside 'python markdown') are resolved from a table built up front.
+    def __init__(self, keywords, ignore_case=True, whole_words=False):
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        self.ignore_case = ignore_case
+        self.whole_words = whole_words
+        self.lookup = {self.fold(k): k for k in self.keywords}
+        self.prefixes = {
+            k: [p for p in self.keywords if p != k and self.fold(k).startswith(self.fold(p))]
+            for k in self.keywords}
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        alternatives = '|'.join(re.escape(k) for k in ordered)
+        if whole_words:
+            pattern = r'(?=(?<!\w)(' + alternatives + r')(?!\w))'
+        else:
+            pattern = '(?=(' + alternatives + '))'
+        flags = re.IGNORECASE if ignore_case else 0
+        self.pattern = re.compile(pattern, flags) if self.keywords else None
+
+    def fold(self, text):
+        return text.lower() if self.ignore_case else text
+
+    def count(self, text):
+        # Returns a Counter of keyword -> number of occurrences in text.
+        counts = Counter()
+        if self.pattern is None or not text:
+            return counts
+        for match in self.pattern.finditer(text):
+            keyword = self.lookup.get(self.fold(match.group(1)))
+            if keyword is None:
+                continue
+            counts[keyword] += 1
+            start = match.start(1)
+            for prefix in self.prefixes[keyword]:
+                end = start + len(prefix)
+                if self.whole_words and end < len(text) and (text[end].isalnum() or text[end] == '_'):
+                    continue
+                counts[prefix] += 1
+        return counts
+
+    def find(self, text):
+        # Returns the keywords that appear in text, in keyword order.
+        found = self.count(text)
+        return [k for k in self.keywords if k in found]
+
+
+# A word, allowing inner apostrophes, dots and dashes and a trailing '+' or '#',
+# so "it's", "node.js", "c++" and "c#" are one word each.
+TOKEN_RE = re.compile(r"\w(?:[\w'+#.-]*[\w+#])?")
+# The terms keywords are looked up by. Words are split at apostrophes and dashes, so
+# 'markdown' is counted in "Markdown's" and "Python-Markdown", but keep inner dots
+# and a trailing '+' or '#' for "node.js", "c++" and "c#".
+TERM_RE = re.compile(r"\w+(?:\.\w+)*[+#]*")
+
+
+class TokenIndex:
+    # The normalized terms of a document, counted once so the word count and the
+    # number of times any keyword or keyphrase is used are dictionary lookups.
+    # Each unit of text (a paragraph, heading or list item) is kept separately so a
+    # phrase is never counted across two of them. Counts for phrases of n terms
+    # are built the first time a phrase of that length is looked up. Keywords are
+    # always counted as whole terms, so 'seo' is never counted in "Seoul".
+    def __init__(self, units=(), ignore_case=True):
+        self.ignore_case = ignore_case
+        self.word_count = 0
+        self.units = []
+        self.unigrams = Counter()
+        self.ngrams = {}
+        for unit in units:
+            self.add(unit)
+
+    def terms(self, text):
+        return TERM_RE.findall(text.lower() if self.ignore_case else text)
+
+    def add(self, text):
+        self.word_count += len(TOKEN_RE.findall(text))
+        terms = self.terms(text)
+        if terms:
+            self.units.append(terms)
+            self.unigrams.update(terms)
+            self.ngrams.clear()
+
+    def ngram_counts(self, n):
+        if n not in self.ngrams:
+            counts = Counter()
+            for terms in self.units:
+                counts.update(zip(*[terms[i:] for i in range(n)]))
+            self.ngrams[n] = counts
+        return self.ngrams[n]
+
+    def count(self, phrase):
+        terms = self.terms(phrase)
+        if not terms:
+            return 0
+        if len(terms) == 1:
+            return self.unigrams[terms[0]]
+        return self.ngram_counts(len(terms))[tuple(terms)]
+
+
+class StreamingTokenIndex(TokenIndex):
+    # Counts the words of a document and the occurrences of phrases as text is
+    # added, without keeping the text or a count for every term, so memory does
+    # not grow with the document. Only the phrases given up front are counted.
+    def __init__(self, phrases, ignore_case=True):
+        self.ignore_case = ignore_case
+        self.word_count = 0
+        self.phrase_counts = {}
+        for phrase in phrases:
+            terms = tuple(self.terms(phrase))
+            if terms:
+                self.phrase_counts[terms] = 0
+        self.lengths = {len(terms) for terms in self.phrase_counts}
+
+    def add(self, text):
+        self.word_count += len(TOKEN_RE.findall(text))
+        terms = self.terms(text)
+        for n in self.lengths:
+            for gram in zip(*[terms[i:] for i in range(n)]):
+                if gram in self.phrase_counts:
+                    self.phrase_counts[gram] += 1
+
+    def count(self, phrase):
+        return self.phrase_counts.get(tuple(self.terms(phrase)), 0)
+
+
+SENTENCE_END_RE = re.compile(r'[.!?]+["\')\]]*(?=\s|$)')
+# Syllables are estimated from the whole text with three patterns instead of word
+# by word: the groups of vowels, less a silent e at the end of a word that has
+# another vowel ('make', but not 'the' or 'table'), plus one for each word
+# without a vowel ('html', '42').
+VOWEL_GROUP_RE = re.compile(r'[aeiouy]+')
+SILENT_E_RE = re.compile(r'[aeiouy][a-z]*[^aeiouyl\W\d_]e\b')
+NO_VOWEL_RE = re.compile(r"(?<![\w'])[^\Waeiouy]+(?![\w'])")
+LONG_SENTENCE_WORDS = 20
+LONG_PARAGRAPH_WORDS = 150
+
+
+def count_syllables(text):
+    text = text.lower()
+    return (len(VOWEL_GROUP_RE.findall(text)) - len(SILENT_E_RE.findall(text)) +
+            len(NO_VOWEL_RE.findall(text)))
+
+
+def readability_scores(words, sentences, syllables):
+    # The Flesch Reading Ease and Flesch-Kincaid grade level. Works on numbers or
+    # on NumPy arrays of them, so the documents of a site are scored at once.
+    words_per_sentence = words / sentences
+    syllables_per_word = syllables / words
+    return (206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word,
+            0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59)
+
+
+class ReadabilityCounts:
+    # Running counts of the sentences, words and syllables of a document, added a
+    # paragraph at a time. Sentence and paragraph lengths are kept as counts per
+    # length, so a streamed document does not keep one number per sentence.
+    def __init__(self, paragraphs=()):
+        self.paragraphs = 0
+        self.sentences = 0
+        self.words = 0
+        self.syllables = 0
+        self.sentence_lengths = Counter()
+        self.paragraph_lengths = Counter()
+        for paragraph in paragraphs:
+            self.add(paragraph)
+
+    def add(self, text):
+        lengths = [length for length in map(len, map(TOKEN_RE.findall, SENTENCE_END_RE.split(text)))
+                   if length]
+        if not lengths:
+            return
+        words = sum(lengths)
+        self.paragraphs += 1
+        self.sentences += len(lengths)
+        self.words += words
+        self.syllables += count_syllables(text)
+        self.sentence_lengths.update(lengths)
+        self.paragraph_lengths[words] += 1
+
+    def to_dict(self):
+        ease = grade = None
+        if self.words:
+            ease, grade = (round(score, 1) for score in
+                           readability_scores(self.words, self.sentences, self.syllables))
+        return {
+            'paragraphs': self.paragraphs,
+            'sentences': self.sentences,
+            'words': self.words,
+            'syllables': self.syllables,
+            'flesch_reading_ease': ease,
+            'flesch_kincaid_grade': grade,
+            'sentence_length': length_stats(self.sentence_lengths, LONG_SENTENCE_WORDS),
+            'paragraph_length': length_stats(self.paragraph_lengths, LONG_PARAGRAPH_WORDS),
+        }
+
+
+def length_stats(lengths, long_words):
+    # lengths maps a length in words to how many sentences or paragraphs have it.
+    count = sum(lengths.values())
+    return {
+        'average': round(sum(length * n for length, n in lengths.items()) / count, 1) if count else 0,
+        'longest': max(lengths, default=0),
+        'long': sum(n for length, n in lengths.items() if length > long_words),
+    }
+
+
+# Near duplicates are found from the MinHash signatures of the shingles (runs of
+# SHINGLE_WORDS words) of each page. Each of the MINHASH_PERMUTATIONS values of a
+# signature is the smallest of (a * x + b) % MINHASH_PRIME over the 32 bit hashes
+# x of the shingles. a < 2 ** 31 keeps every product inside 64 bits, so NumPy
+# and plain Python work out the same signature, and a prime below 2 ** 32 keeps
+# every value inside 32 bits.
+SHINGLE_WORDS = 4
+MINHASH_PERMUTATIONS = 128
+MINHASH_PRIME = (1 << 32) - 5
+MINHASH_BATCH = 4096
+_minhash_random = random.Random(0)
+MINHASH_PARAMETERS = [(_minhash_random.randrange(1, 1 << 31), _minhash_random.randrange(1 << 31))
+                      for _ in range(MINHASH_PERMUTATIONS)]
+del _minhash_random
+
+
+@functools.lru_cache(maxsize=None)
+def get_numpy():
+    # NumPy is only needed to score the readability of a whole site at once and to
+    # fold MinHash signatures; without it the same numbers are worked out a value
+    # at a time. It is imported the first time it is needed, as importing it takes
+    # longer than checking a document.
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def minhash_values(hashes):
+    numpy = get_numpy()
+    if numpy is not None:
+        a, b = numpy.array(MINHASH_PARAMETERS, dtype=numpy.uint64).T
+        values = numpy.fromiter(hashes, dtype=numpy.uint64, count=len(hashes))
+        return ((values[:, None] * a + b) % MINHASH_PRIME).min(axis=0).tolist()
+    return [min((a * x + b) % MINHASH_PRIME for x in hashes) for a, b in MINHASH_PARAMETERS]
+
+
+class MinHash:
+    # The MinHash signature of a document, added a unit of text (a paragraph,
+    # heading or list item) at a time. Shingles never span two units. The hashes
+    # are folded into the signature MINHASH_BATCH at a time, as the smallest value
+    # of a batch is also the smallest of the document, so memory does not grow
+    # with the document.
+    def __init__(self, units=()):
+        self.values = None
+        self.pending = set()
+        for unit in units:
+            self.add(unit)
+
+    def add(self, text):
+        tokens = TOKEN_RE.findall(text.lower())
+        for start in range(max(1, len(tokens) - SHINGLE_WORDS + 1) if tokens else 0):
+            shingle = ' '.join(tokens[start:start + SHINGLE_WORDS])
+            self.pending.add(zlib.crc32(shingle.encode('utf-8')))
+        if len(self.pending) >= MINHASH_BATCH:
+            self.fold()
+
+    def fold(self):
+        if self.pending:
+            values = minhash_values(self.pending)
+            self.values = values if self.values is None else list(map(min, self.values, values))
+            self.pending = set()
+
+    def signature(self):
+        # None for a document without text.
+        self.fold()
+        return self.values
+
+
+@functools.lru_cache(maxsize=256)
+def get_matcher(keywords, ignore_case=True, whole_words=False):
+    return KeywordMatcher(keywords, ignore_case, whole_words)
+
+
+@dataclass
+class Result:
+    # The outcome of analyzing one document. Images, links and headings are kept as
+    # plain dicts and lists so a Result pickles and serializes cheaply. checks lists
+    # the checks that ran; the fields of the other checks are None. Checks that are
+    # not built in keep their results in extra, under the name of the check.
+    __slots__ = ('file', 'title', 'meta_description', 'focus_keyword', 'keywords',
+                 'word_count', 'keyword_count', 'keyword_density', 'keyword_in_title',
+                 'keyword_in_meta_description', 'keyword_usage', 'images', 'links',
+                 'headings', 'readability', 'fingerprint', 'permalink', 'slug', 'checks',
+                 'extra')
+    file: str
+    title: str
+    meta_description: str
+    focus_keyword: str
+    keywords: list
+    word_count: int
+    keyword_count: int
+    keyword_density: float
+    keyword_in_title: bool
+    keyword_in_meta_description: bool
+    keyword_usage: dict
+    images: list
+    links: list
+    headings: dict
+    readability: dict
+    fingerprint: list
+    permalink: str
+    slug: str
+    checks: list
+    extra: dict
+
+    @property
+    def title_length(self):
+        return len(self.title or '')
+
+    @property
+    def internal_links(self):
+        return [link for link in self.links or [] if link['internal']]
+
+    @property
+    def external_links(self):
+        return [link for link in self.links or [] if not link['internal']]
+
+
+def result_to_dict(result):
+    return asdict(result)
+
+
+def result_from_dict(data):
+    # JSON turns the heading levels into strings. headings is None when no check
+    # that reads them ran.
+    data = dict(data, headings=data['headings'] and {
+        int(level): headings for level, headings in data['headings'].items()})
+    return Result(**data)
+
+
+class AnalysisContext:
+    # What the checks of one document work from. Everything derived from the
+    # content is computed the first time a check asks for it, so a value that no
+    # selected check uses is never computed.
+    def __init__(self, content, front_matter, domain, focus_keyword, keywords, matcher,
+                 title=None, description=None, kw_lookup=None, desc_lookup=None,
+                 ignore_case=True, count_scope='paragraphs', fingerprint=False, index=None,
+                 readability=None, minhash=None):
+        self.content = content
+        if index is not None:
+            self.index = index
+        if readability is not None:
+            self.readability = readability
+        if minhash is not None:
+            self.minhash = minhash
+        self.front_matter = front_matter
+        self.domain = domain
+        self.focus_keyword = focus_keyword
+        self.keywords = keywords
+        self.matcher = matcher
+        self.options = {'title': title, 'description': description, 'kw_lookup': kw_lookup,
+                        'desc_lookup': desc_lookup, 'ignore_case': ignore_case,
+                        'count_scope': count_scope, 'fingerprint': fingerprint}
+
+    @functools.cached_property
+    def title(self):
+        # If there is front matter the 'title' will be used instead of the first h1.
+        title, kw_lookup = self.options['title'], self.options['kw_lookup']
+        if title is None and kw_lookup:
+            return front_matter_field(self.front_matter, 'title')
+        if title is None:
+            return self.content.headings[1][0] if self.content.headings[1] else ''
+        return title
+
+    @functools.cached_property
+    def meta_description(self):
+        # Some of SSGs (Static Site Generators) can use the contents of your first paragraph
+        # as the meta description of your HTML document. The default is to check the first
+        # 160 characters of the first paragraph for the focus keyword.
+        if self.options['desc_lookup']:
+            return front_matter_field(self.front_matter, self.options['desc_lookup'])
+        if self.options['description']:
+            return self.options['description']
+        first_paragraph = self.content.paragraphs[0] if self.content.paragraphs else ''
+        return first_paragraph[0: 160:]
+
+    # Every field is scanned once for all of the keywords.
+    @functools.cached_property
+    def title_keywords(self):
+        return self.matcher.find(self.title)
+
+    @functools.cached_property
+    def meta_description_keywords(self):
+        return self.matcher.find(self.meta_description)
+
+    @functools.cached_property
+    def index(self):
+        # SEO best practices are not clear on what 'Google' considers a good length
+        # for content. I have settled on on a minimum of 300 - 500 words. Words and
+        # keywords are counted in paragraphs, or with count_scope='all' also in
+        # headings and list items.
+        content = self.content
+        units = content.paragraphs
+        if self.options['count_scope'] == 'all':
+            units = units + [heading for level in range(1, 7)
+                             for heading in content.headings[level]] + content.list_items
+        return TokenIndex(units, self.options['ignore_case'])
+
+    @functools.cached_property
+    def readability(self):
+        return ReadabilityCounts(self.content.paragraphs)
+
+    @functools.cached_property
+    def minhash(self):
+        return MinHash(self.content.text_units())
+
+    @functools.cached_property
+    def images(self):
+        return [dict(image, keywords=self.matcher.find(image['alt']))
+                for image in self.content.images]
+
+    @functools.cached_property
+    def headings(self):
+        return {level: [{'text': heading, 'keywords': self.matcher.find(heading)}
+                        for heading in self.content.headings[level]]
+                for level in range(1, 7)}
+
+    @functools.cached_property
+    def links(self):
+        domain_re = re.compile(self.domain, re.IGNORECASE)
+        return [dict(link, internal=bool(domain_re.search(link['href'])))
+                for link in self.content.links]
+
+
+class Check:
+    # A section of the report. needs() names the features of the document the
+    # check reads (the keys of FEATURE_TAGS, 'tokens' and 'sentences'), so only
+    # those are extracted when just some checks run. run() returns the values it
+    # found: the Result fields of the same name for the built in checks, or
+    # anything that serializes to JSON for other checks, kept in
+    # Result.extra[name]. report() prints the section from a Result. Register
+    # other checks with register_check() or an 'onpageseo.checks' entry point.
+    name = None
+    section = None
+    builtin = False
+
+    def needs(self, options):
+        return set()
+
+    def run(self, context):
+        return {}
+
+    def elements(self, values):
+        # Number of elements looked at, for --profile.
+        return 0
+
+    def report(self, result):
+        pass
+
+
+class TitleCheck(Check):
+    name = 'title'
+    section = 'Title'
+    builtin = True
+
+    def needs(self, options):
+        if options.get('title') is not None or options.get('kw_lookup'):
+            return set()
+        return {'headings'}
+
+    def run(self, context):
+        return {'title': context.title,
+                'keyword_in_title': context.focus_keyword in context.title_keywords}
+
+    def elements(self, values):
+        return 1
+
+    def report(self, result):
+        print_title_section(result)
+
+
+class MetaDescriptionCheck(Check):
+    name = 'meta-description'
+    section = 'Meta Description'
+    builtin = True
+
+    def needs(self, options):
+        if options.get('desc_lookup') or options.get('description'):
+            return set()
+        return {'paragraphs'}
+
+    def run(self, context):
+        return {'meta_description': context.meta_description,
+                'keyword_in_meta_description':
+                    context.focus_keyword in context.meta_description_keywords}
+
+    def elements(self, values):
+        return 1
+
+    def report(self, result):
+        print_meta_description_section(result)
+
+
+class WordCountCheck(Check):
+    name = 'word-count'
+    section = 'Word Count'
+    builtin = True
+
+    def needs(self, options):
+        return {'tokens'}
+
+    def run(self, context):
+        return {'word_count': context.index.word_count}
+
+    def elements(self, values):
+        return values['word_count']
+
+    def report(self, result):
+        print_word_count_section(result)
+
+
+class KeywordCheck(Check):
+    # The focus keyword count and density, and where every keyword is used.
+    name = 'keywords'
+    section = 'Keyword Count & Density'
+    builtin = True
+
+    def needs(self, options):
+        return ({'tokens', 'images', 'headings'} | TitleCheck().needs(options) |
+                MetaDescriptionCheck().needs(options))
+
+    def run(self, context):
+        index = context.index
+        word_count = index.word_count
+        keyword_usage = {}
+        for keyword in context.keywords:
+            count = index.count(keyword)
+            keyword_usage[keyword] = {
+                'title': keyword in context.title_keywords,
+                'meta_description': keyword in context.meta_description_keywords,
+                'count': count,
+                'density': density(count, word_count),
+                'images': sum(1 for image in context.images if keyword in image['keywords']),
+                'headings': sum(1 for level in range(2, 7)
+                                for heading in context.headings[level]
+                                if keyword in heading['keywords']),
+            }
+        usage = keyword_usage[context.focus_keyword]
+        return {'word_count': word_count, 'keyword_count': usage['count'],
+                'keyword_density': usage['density'], 'keyword_usage': keyword_usage}
+
+    def elements(self, values):
+        return len(values['keyword_usage'])
+
+    def report(self, result):
+        print_keyword_section(result)
+
+
+class ImagesCheck(Check):
+    name = 'images'
+    section = 'Images'
+    builtin = True
+
+    def needs(self, options):
+        return {'images'}
+
+    def run(self, context):
+        return {'images': context.images}
+
+    def elements(self, values):
+        return len(values['images'])
+
+    def report(self, result):
+        print_images_section(result)
+
+
+class LinksCheck(Check):
+    name = 'links'
+    section = 'Links'
+    builtin = True
+
+    def needs(self, options):
+        return {'links'}
+
+    def run(self, context):
+        return {'links': context.links}
+
+    def elements(self, values):
+        return len(values['links'])
+
+    def report(self, result):
+        print_links_section(result)
+
+
+class StructureCheck(Check):
+    name = 'structure'
+    section = 'Content Structure'
+    builtin = True
+
+    def needs(self, options):
+        return {'headings'}
+
+    def run(self, context):
+        return {'headings': context.headings}
+
+    def elements(self, values):
+        return sum(len(values['headings'][level]) for level in range(1, 7))
+
+    def report(self, result):
+        print_structure_section(result)
+
+
+class ReadabilityCheck(Check):
+    name = 'readability'
+    section = 'Readability'
+    builtin = True
+
+    def needs(self, options):
+        return {'sentences'}
+
+    def run(self, context):
+        return {'readability': context.readability.to_dict()}
+
+    def elements(self, values):
+        return values['readability']['sentences']
+
+    def report(self, result):
+        print_readability_section(result)
+
+
+# Checks by name, in the order they run and are reported. Built on first use so
+# entry points are only looked up when checks are.
+_checks = None
+
+
+def get_checks():
+    global _checks
+    if _checks is None:
+        _checks = {}
+        for check in [TitleCheck(), MetaDescriptionCheck(), WordCountCheck(), KeywordCheck(),
+                      ImagesCheck(), LinksCheck(), StructureCheck(), ReadabilityCheck()]:
+            _checks[check.name] = check
+        load_check_plugins()
+    return _checks
+
+
+def register_check(check):
+    # check is a Check instance or subclass. A check with the name of an existing
+    # one replaces it.
+    if isinstance(check, type):
+        check = check()
+    if not check.name:
+        raise ValueError('A check needs a name.')
+    get_checks()[check.name] = check
+    return check
+
+
+def load_check_plugins():
+    # Checks installed by other packages under the 'onpageseo.checks' entry point
+    # group. A plugin that fails to load is reported and skipped.
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return
+    found = entry_points()
+    found = (found.select(group='onpageseo.checks') if hasattr(found, 'select')
+             else found.get('onpageseo.checks', []))
+    for entry_point in found:
+        try:
+            register_check(entry_point.load())
+        except Exception as e:
+            print(f'Unable to load the check "{entry_point.name}": {type(e).__name__}: {e}',
+                  file=sys.stderr)
+
+
+def select_checks(names=None, skip=()):
+    # Returns the checks to run, in registry order. names=None selects every check.
+    checks = get_checks()
+    unknown = [name for name in list(names or []) + list(skip) if name not in checks]
+    if unknown:
+        raise ValueError('Unknown check(s): ' + ', '.join(unknown) +
+                         '. Available: ' + ', '.join(checks) + '.')
+    return [check for name, check in checks.items()
+            if (names is None or name in names) and name not in skip]
+
+
+def needed_features(checks, options):
+    features = set()
+    for check in checks:
+        features |= check.needs(options)
+    if 'sentences' in features:
+        features.add('paragraphs')
+    if options.get('fingerprint'):
+        features |= {'paragraphs', 'headings', 'list_items'}
+    if 'tokens' in features:
+        features.add('paragraphs')
+        if options.get('count_scope') == 'all':
+            features |= {'headings', 'list_items'}
+    return features
+
+
+def feature_tags(checks, options):
+    # The tags that have to be collected from the document for checks.
+    features = needed_features(checks, options)
+    return set().union(*(FEATURE_TAGS[feature] for feature in features if feature in FEATURE_TAGS))
+
+
+def resolve_keywords(front_matter, focus_keyword, keywords, kw_lookup, ignore_case, whole_words):
+    # Returns the focus keyword, every keyword and their matcher. With front matter
+    # the first keyword in the kw_lookup field is the focus keyword and the rest
+    # are secondary keywords.
+    if kw_lookup:
+        keywords = split_keywords(front_matter_field(front_matter, kw_lookup, all_values=True))
+        focus_keyword = keywords[0] if keywords else None
+    if not focus_keyword:
+        raise ValueError('A focus keyword or a kw_lookup field is required.')
+    keywords = [focus_keyword] + [k for k in keywords if k != focus_keyword]
+    matcher = get_matcher(tuple(keywords), ignore_case, whole_words)
+    return focus_keyword, matcher.keywords, matcher
+
+
+# Streamed documents are converted in blocks of about this many characters.
+STREAM_BLOCK_SIZE = 256 * 1024
+FENCE_RE = re.compile(r' {0,3}(`{3,}|~{3,})')
+LIST_ITEM_RE = re.compile(r' {0,3}([*+-]|\d+\.)[ \t]')
+HTML_BLOCK_RE = re.compile(r' {0,3}<(!--|[a-zA-Z][a-zA-Z0-9]*)(?=[\s/>]|$)')
+REFERENCE_RE = re.compile(r' {0,3}\[([^\[\]]+)\]:[ \t]*<?([^\s>]+)>?(?:[ \t]+["\'(](.*)["\')])?[ \t]*$')
+
+
+def markdown_blocks(lines, block_size=STREAM_BLOCK_SIZE):
+    # Joins lines into blocks of at least block_size characters. A block only ends
+    # at a blank line followed by a line that starts a new top level block, never
+    # inside a fenced code block, a raw HTML block, a list or an indented code
+    # block, so converting the blocks one by one gives the same elements as
+    # converting the whole text.
+    block = []
+    size = 0
+    fence = None
+    html = None
+    after_blank = False
+    for line in lines:
+        if fence:
+            if line.lstrip(' ').startswith(fence) and not line.strip().strip(fence[0]):
+                fence = None
+        elif html:
+            html = open_html_block(line, html)
+        else:
+            if (after_blank and size >= block_size and line.strip() and
+                    not line[0].isspace() and not LIST_ITEM_RE.match(line)):
+                yield ''.join(block)
+                block = []
+                size = 0
+            match = FENCE_RE.match(line)
+            if match:
+                fence = match.group(1)
+            else:
+                html = open_html_block(line)
+        after_blank = not fence and not html and not line.strip()
+        block.append(line)
+        size += len(line)
+    if block:
+        yield ''.join(block)
+
+
+def open_html_block(line, html=None):
+    # Returns the raw HTML block still open after line, as its tag and how many
+    # times the tag is open, or None. Like Python-Markdown, a block-level tag or a
+    # comment at the start of a line starts a block, blank lines included, that
+    # lasts until the tag is closed again or the end of the document.
+    if html is None:
+        match = HTML_BLOCK_RE.match(line)
+        if not match:
+            return None
+        tag = match.group(1).lower()
+        if tag == '!--':
+            return None if '-->' in line[match.end():] else (tag, 1)
+        if tag not in BLOCK_LEVEL_ELEMENTS or tag == 'hr':
+            return None
+        depth = 0
+    else:
+        tag, depth = html
+        if tag == '!--':
+            return None if '-->' in line else html
+    depth += (len(re.findall('<' + tag + r'(?=[\s/>]|$)', line, re.IGNORECASE)) -
+              len(re.findall('</' + tag + r'\s*>', line, re.IGNORECASE)))
+    return (tag, depth) if depth > 0 else None
+
+
+def reference_definitions(lines):
+    # The reference-style link definitions ('[id]: url "title"') of a document, in
+    # the form Python-Markdown keeps them.
+    references = {}
+    for line in lines:
+        match = REFERENCE_RE.match(line)
+        if match:
+            references[match.group(1).strip().lower()] = (match.group(2), match.group(3))
+    return references
+
+
+RESULT_FIELDS = Result.__slots__
+
+
+class Analyzer:
+    # Runs the on-page checks on Markdown text. One Markdown instance is created per
+    # Analyzer and reset between documents. Python-Markdown instances are not thread
+    # safe, so use one Analyzer per thread.
+    def __init__(self, backend='tree'):
+        if backend == 'soup':
+            if BeautifulSoup is None:
+                raise ImportError('The soup backend requires BeautifulSoup4.')
+            self.md = markdown.Markdown(extensions=['meta'])
+        else:
+            self.md = markdown.Markdown(extensions=['meta', ContentExtension()])
+        self.backend = backend
+        self.stream_md = None
+
+    def convert(self, text, profiler=NULL_PROFILER, tags=ALL_TAGS, references=None, md=None):
+        # Returns the Content made of the elements in tags and the front matter.
+        # When no elements are needed only the front matter is read.
+        md = md or self.md
+        md.reset()
+        if references:
+            md.references.update(references)
+        if not tags:
+            with profiler.phase('Convert'):
+                lines = text.split('\n')
+                for name in ('normalize_whitespace', 'meta'):
+                    lines = md.preprocessors[name].run(lines)
+            return Content(), md.Meta
+        if self.backend == 'soup':
+            with profiler.phase('Convert'):
+                html = md.convert(text)
+            content = soup_content(html, profiler, tags)
+        else:
+            treeprocessor = md.treeprocessors['content']
+            treeprocessor.profiler = profiler
+            treeprocessor.tags = tags
+            # Python-Markdown skips the treeprocessors for blank text.
+            treeprocessor.content = Content()
+            try:
+                with profiler.phase('Convert'):
+                    md.convert(text)
+            finally:
+                treeprocessor.profiler = NULL_PROFILER
+                treeprocessor.tags = ALL_TAGS
+            content = treeprocessor.content
+        return content, getattr(md, 'Meta', {})
+
+    def analyze(self, text, domain, focus_keyword=None, kw_lookup=None, title=None,
+                description=None, desc_lookup=None, file=None, keywords=(),
+                ignore_case=True, whole_words=False, count_scope='paragraphs',
+                checks=None, skip=(), profiler=NULL_PROFILER, fingerprint=False):
+        # checks and skip are lists of check names; by default every check runs.
+        # fingerprint adds the MinHash signature of the text used to find near
+        # duplicate pages.
+        options = {'title': title, 'description': description, 'kw_lookup': kw_lookup,
+                   'desc_lookup': desc_lookup, 'count_scope': count_scope,
+                   'fingerprint': fingerprint}
+        selected = select_checks(checks, skip)
+        content, front_matter = self.convert(text, profiler, feature_tags(selected, options))
+        focus_keyword, keywords, matcher = resolve_keywords(
+            front_matter, focus_keyword, keywords, kw_lookup, ignore_case, whole_words)
+        context = AnalysisContext(content, front_matter, domain, focus_keyword, keywords,
+                                  matcher, ignore_case=ignore_case, **options)
+        return self.run_checks(context, selected, file, profiler)
+
+    def analyze_stream(self, lines, domain, focus_keyword=None, kw_lookup=None, title=None,
+                       description=None, desc_lookup=None, file=None, keywords=(),
+                       ignore_case=True, whole_words=False, count_scope='paragraphs',
+                       checks=None, skip=(), profiler=NULL_PROFILER, fingerprint=False,
+                       references=None, block_size=STREAM_BLOCK_SIZE):
+        # Like analyze(), for documents too large to hold in memory. lines is an
+        # iterable of the lines of the document, such as an open file. The body is
+        # converted a block at a time and only running totals are kept: the word
+        # count, the occurrences of each keyword, the readability counts, the
+        # MinHash signature, the first paragraph, headings, images and links.
+        # references are the reference-style link definitions of the whole
+        # document (see reference_definitions()), since a definition can be in
+        # another block than the links that use it.
+        options = {'title': title, 'description': description, 'kw_lookup': kw_lookup,
+                   'desc_lookup': desc_lookup, 'count_scope': count_scope,
+                   'fingerprint': fingerprint}
+        selected = select_checks(checks, skip)
+        features = needed_features(selected, options)
+        tags = feature_tags(selected, options)
+        lines = iter(lines)
+        with profiler.phase('Convert'):
+            front_matter, head = self.read_front_matter(lines)
+        focus_keyword, keywords, matcher = resolve_keywords(
+            front_matter, focus_keyword, keywords, kw_lookup, ignore_case, whole_words)
+
+        index = StreamingTokenIndex(keywords, ignore_case)
+        readability = ReadabilityCounts()
+        minhash = MinHash()
+        content = Content()
+        if tags:
+            body_md = self.body_markdown()
+            for block in markdown_blocks(itertools.chain(head, lines), block_size):
+                part = self.convert(block, profiler, tags, references, body_md)[0]
+                if part.paragraphs and not content.paragraphs:
+                    content.paragraphs.append(part.paragraphs[0])
+                if 'sentences' in features:
+                    for paragraph in part.paragraphs:
+                        readability.add(paragraph)
+                if fingerprint:
+                    for unit in part.text_units():
+                        minhash.add(unit)
+                if 'tokens' in features:
+                    for unit in part.paragraphs:
+                        index.add(unit)
+                    if count_scope == 'all':
+                        for level in range(1, 7):
+                            for unit in part.headings[level]:
+                                index.add(unit)
+                        for unit in part.list_items:
+                            index.add(unit)
+                for level in range(1, 7):
+                    content.headings[level].extend(part.headings[level])
+                content.images.extend(part.images)
+                content.links.extend(part.links)
+
+        context = AnalysisContext(content, front_matter, domain, focus_keyword, keywords,
+                                  matcher, ignore_case=ignore_case, index=index,
+                                  readability=readability, minhash=minhash, **options)
+        return self.run_checks(context, selected, file, profiler)
+
+    def read_front_matter(self, lines):
+        # Returns the front matter and the lines read past it. The front matter ends
+        # at the first blank line, so only that much of the document is read.
+        md = self.md
+        md.reset()
+        head = []
+        size = 0
+        for line in lines:
+            head.append(line.rstrip('\n'))
+            size += len(line)
+            if not line.strip() or size > STREAM_BLOCK_SIZE:
+                break
+        for name in ('normalize_whitespace', 'meta'):
+            head = md.preprocessors[name].run(head)
+        return md.Meta, [line + '\n' for line in head]
+
+    def body_markdown(self):
+        # A Markdown instance without the meta extension, so a block that happens to
+        # start with 'Word: text' is not read as front matter.
+        if self.stream_md is None:
+            extensions = [] if self.backend == 'soup' else [ContentExtension()]
+            self.stream_md = markdown.Markdown(extensions=extensions)
+        return self.stream_md
+
+    def run_checks(self, context, selected, file, profiler):
+        front_matter = context.front_matter
+        fields = dict.fromkeys(RESULT_FIELDS)
+        fields.update(file=file, focus_keyword=context.focus_keyword, keywords=context.keywords,
+                      checks=[check.name for check in selected], extra={})
+        for check in selected:
+            with profiler.phase(check.section) as record:
+                values = check.run(context)
+                record['elements'] = check.elements(values)
+            if check.builtin:
+                fields.update(values)
+            else:
+                fields['extra'][check.name] = values
+        if context.options['fingerprint']:
+            with profiler.phase('Fingerprint'):
+                fields['fingerprint'] = context.minhash.signature()
+
+        # Where the page will be published, used to resolve links between pages.
+        fields['permalink'] = (front_matter.get('permalink') or front_matter.get('url') or [None])[0]
+        fields['slug'] = (front_matter.get('slug') or [None])[0]
+        return Result(**fields)
+
+
+# Analyzers are created on first use and kept for the life of the process, so
+# batch workers and long-running callers reuse the same Markdown instance.
+_analyzers = {}
+
+
+def get_analyzer(backend='tree'):
+    if backend not in _analyzers:
+        _analyzers[backend] = Analyzer(backend)
+    return _analyzers[backend]
+
+
+def analyze(text, domain, backend='tree', **options):
+    # Analyze Markdown text and return a Result. The options are the keyword
+    # arguments of Analyzer.analyze(): focus_keyword or kw_lookup, title,
+    # description, desc_lookup and file.
+    return get_analyzer(backend).analyze(text, domain, **options)
+
+
+def default_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'onpageseo')
+
+
+CACHE_BUCKET_RE = re.compile(r'[0-9a-f]{2}')
+CACHE_ENTRY_RE = re.compile(r'[0-9a-f]{64}\.json')
+
+
+class ResultCache:
+    # Keeps analysis results on disk so unchanged files are not converted again.
+    # Entries are keyed by a hash of the file contents, the analysis options and the
+    # version of this script, so a changed file or option is simply a new entry and
+    # stale entries age out through prune().
+    def __init__(self, directory, max_age_days=30, max_size_mb=100):
+        self.directory = directory
+        self.max_age = max_age_days * 24 * 60 * 60
+        self.max_size = max_size_mb * 1024 * 1024
+
+    def key(self, data, options):
+        digest = self.digest(options)
+        digest.update(data)
+        return digest.hexdigest()
+
+    def key_file(self, path, options):
+        # The same key as key() for the contents of path, read a chunk at a time.
+        digest = self.digest(options)
+        with open(path, 'rb') as input_file:
+            for chunk in iter(lambda: input_file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def digest(self, options):
+        digest = hashlib.sha256()
+        digest.update(__version__.encode('utf-8'))
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        return digest
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                result = result_from_dict(json.load(cache_file))
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return None
+        # Touch the entry so pruning removes the least recently used entries first.
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return result
+
+    def put(self, key, result):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so parallel workers never read a partial entry.
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as cache_file:
+            json.dump(result_to_dict(result), cache_file, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    def entries(self):
+        # Only the files put() writes are entries, so the site indexes stored next to
+        # them, and anything else in a mistyped --cache-dir, are never removed.
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for bucket in os.scandir(self.directory):
+            if not (CACHE_BUCKET_RE.fullmatch(bucket.name) and
+                    bucket.is_dir(follow_symlinks=False)):
+                continue
+            for entry in os.scandir(bucket.path):
+                if (CACHE_ENTRY_RE.fullmatch(entry.name) and entry.name.startswith(bucket.name)
+                        and entry.is_file(follow_symlinks=False)):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def prune(self):
+        # Remove entries older than max_age, then the least recently used entries
+        # until the cache fits in max_size.
+        now = time.time()
+        entries = sorted(self.entries())
+        total_size = sum(size for mtime, size, path in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total_size <= self.max_size:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                removed += 1
+            total_size -= size
+        return removed
+
+    def clear(self):
+        removed = 0
+        for mtime, size, path in self.entries():
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+def batch_root(path):
+    # The directory page URLs are derived from: the directory itself, or for a
+    # pattern such as 'content/**/*.md' the part before the first wildcard.
+    if os.path.isdir(path):
+        return path
+    parts = []
+    for part in path.split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or os.curdir
+
+
+def normalize_url_path(path):
+    # '/posts/a', '/posts/a/index.html' and 'posts/a/' are all '/posts/a/'. Paths
+    # to files, such as '/feed.xml', keep their name.
+    path = posixpath.normpath('/' + path.strip().lstrip('/'))
+    path = re.sub(r'/index\.html?$', '/', path)
+    if not posixpath.splitext(path)[1] and not path.endswith('/'):
+        path += '/'
+    return path
+
+
+def page_url(result, file, root):
+    # A permalink or url field in the front matter is used as is. Otherwise the URL
+    # is the path of the file under root, with the name replaced by the slug field
+    # if there is one: content/posts/first.md is /posts/first/.
+    if result.permalink:
+        return normalize_url_path(urllib.parse.urlsplit(result.permalink).path)
+    path = os.path.splitext(os.path.relpath(file, root))[0].replace(os.sep, '/')
+    directory, name = posixpath.split(path)
+    if result.slug:
+        name = result.slug
+    elif name in ('index', '_index'):
+        name = ''
+    return normalize_url_path(posixpath.join(directory, name))
+
+
+def file_key(file, root):
+    # Links written as paths to Markdown files ('../guide/setup.md') are resolved
+    # through this key, since the target may have a permalink of its own.
+    return 'file:' + posixpath.normpath(os.path.relpath(file, root).replace(os.sep, '/'))
+
+
+def link_targets(result, file, root, url):
+    # Returns (href, key) for every link that points at a page of the site, where
+    # key is the URL or file key of the target. Links to other sites, 'mailto:'
+    # links and links to a part of the same page are left out.
+    targets = []
+    source_directory = posixpath.dirname(file_key(file, root)[len('file:'):])
+    for link in result.links:
+        href = link['href']
+        parts = urllib.parse.urlsplit(href)
+        if parts.scheme and parts.scheme not in ('http', 'https'):
+            continue
+        if parts.netloc and not link['internal']:
+            continue
+        if not parts.path:
+            continue
+        path = urllib.parse.unquote(parts.path)
+        if path.lower().endswith(MARKDOWN_EXTENSIONS) and not parts.netloc:
+            if not path.startswith('/'):
+                path = posixpath.join(source_directory, path)
+            targets.append((href, 'file:' + posixpath.normpath(path).lstrip('/')))
+        else:
+            targets.append((href, normalize_url_path(urllib.parse.urljoin(url, path))))
+    return targets
+
+
+class LinkGraph:
+    # The internal links of a whole site. Every page is indexed under its URL and
+    # its file key, and inbound links are kept per URL whether or not a page with
+    # that URL exists, so resolving a link, adding a page that fixes broken links
+    # and removing one that breaks them are dictionary operations. update() only
+    # touches the page it is given, and each page keeps the modification time and
+    # size of its file, so after loading the graph of the previous run only the
+    # pages whose files changed are looked at again.
+    def __init__(self):
+        self.pages = {}  # file -> URL
+        self.keys = {}  # file -> file key
+        self.stamps = {}  # file -> [modification time, size]
+        self.index = {}  # URL or file key -> file
+        self.links = {}  # file -> [(href, key)]
+        self.inbound = {}  # URL or file key -> {source file}
+
+    def update(self, file, url, key, targets, stamp=None):
+        # Returns False when the page and its links are unchanged.
+        if self.pages.get(file) == url and self.links.get(file) == targets:
+            self.stamps[file] = stamp
+            return False
+        self.remove(file)
+        self.pages[file] = url
+        self.keys[file] = key
+        self.stamps[file] = stamp
+        self.index[url] = file
+        self.index[key] = file
+        self.links[file] = targets
+        for href, target in targets:
+            self.inbound.setdefault(target, set()).add(file)
+        return True
+
+    def remove(self, file):
+        if file not in self.pages:
+            return
+        self.stamps.pop(file)
+        for key in (self.pages.pop(file), self.keys.pop(file)):
+            if self.index.get(key) == file:
+                del self.index[key]
+        for href, target in self.links.pop(file):
+            sources = self.inbound.get(target)
+            if sources:
+                sources.discard(file)
+                if not sources:
+                    del self.inbound[target]
+
+    def is_current(self, file, stamp):
+        return file in self.pages and self.stamps[file] == stamp
+
+    def prune(self, files):
+        # Drop the pages that are not in files, for example deleted documents.
+        for file in set(self.pages) - set(files):
+            self.remove(file)
+
+    def outbound(self, file):
+        return sorted({self.index[target] for href, target in self.links[file]
+                       if target in self.index and self.index[target] != file})
+
+    def inbound_pages(self, file):
+        sources = set()
+        for key in (self.pages[file], self.keys[file]):
+            sources |= self.inbound.get(key, set())
+        sources.discard(file)
+        return sorted(sources)
+
+    def broken(self):
+        return [(file, href) for file in sorted(self.links)
+                for href, target in self.links[file] if target not in self.index]
+
+    def orphans(self, home=None):
+        return [file for file in sorted(self.pages)
+                if file != home and not self.inbound_pages(file)]
+
+    def depths(self, home):
+        # Clicks needed to reach each page from the home page.
+        depths = {home: 0}
+        queue = deque([home])
+        while queue:
+            file = queue.popleft()
+            for target in self.outbound(file):
+                if target not in depths:
+                    depths[target] = depths[file] + 1
+                    queue.append(target)
+        return depths
+
+    def report(self, home_url='/'):
+        home = self.index.get(normalize_url_path(home_url))
+        broken = self.broken()
+        report = {
+            'pages': len(self.pages),
+            'links': sum(len(targets) for targets in self.links.values()),
+            'broken_links': [{'file': file, 'href': href} for file, href in broken],
+            'orphans': self.orphans(home),
+            'home': home,
+            'depth': None,
+            'graph': {file: {'url': url, 'outbound': self.outbound(file),
+                             'inbound': self.inbound_pages(file)}
+                      for file, url in sorted(self.pages.items())},
+        }
+        if home:
+            depths = self.depths(home)
+            counts = Counter(depths.values())
+            report['depth'] = {
+                'max': max(depths.values()),
+                'average': round(sum(depths.values()) / len(depths), 2),
+                'pages_by_depth': {depth: counts[depth] for depth in sorted(counts)},
+                'deeper_than_3': sum(1 for depth in depths.values() if depth > 3),
+                'unreachable': len(self.pages) - len(depths),
+            }
+        return report
+
+    def to_dict(self):
+        return {'pages': self.pages, 'keys': self.keys, 'stamps': self.stamps,
+                'links': self.links}
+
+    @classmethod
+    def from_dict(cls, data):
+        graph = cls()
+        for file, url in data['pages'].items():
+            graph.update(file, url, data['keys'][file],
+                         [tuple(target) for target in data['links'][file]],
+                         data['stamps'][file])
+        return graph
+
+
+def site_index_path(args, kind):
+    # One stored link graph or duplicate index (kind is 'graphs' or 'duplicates')
+    # per site root, domain and analysis options.
+    digest = hashlib.sha256()
+    digest.update(__version__.encode('utf-8'))
+    digest.update(os.path.abspath(batch_root(args.file)).encode('utf-8'))
+    digest.update(json.dumps(dict(analysis_options(args), domain=args.domain,
+                                  backend=args.backend), sort_keys=True).encode('utf-8'))
+    return os.path.join(args.cache_dir, kind, digest.hexdigest() + '.json')
+
+
+def file_stamp(file):
+    stat = os.stat(file)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def update_link_graph(graph, file, result, error, root):
+    if error:
+        graph.remove(file)
+        return
+    stamp = file_stamp(file)
+    if graph.is_current(file, stamp):
+        return
+    url = page_url(result, file, root)
+    graph.update(file, url, file_key(file, root), link_targets(result, file, root, url), stamp)
+
+
+def load_link_graph(path):
+    if path:
+        try:
+            with open(path, 'r', encoding='utf-8') as graph_file:
+                return LinkGraph.from_dict(json.load(graph_file))
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+    return LinkGraph()
+
+
+def save_site_index(index, path):
+    # Stores a LinkGraph or DuplicateIndex.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as index_file:
+        json.dump(index.to_dict(), index_file, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+
+def lsh_rows(threshold):
+    # Signatures are cut into bands of this many values, and two pages that share
+    # a whole band are compared. Pages of similarity s share a band with a chance
+    # of 1 - (1 - s ** rows) ** bands, which rises steeply around
+    # (1 / bands) ** (1 / rows). The most rows that keep that point at or below
+    # threshold give the fewest needless comparisons while missing few pairs.
+    rows = 1
+    for candidate in (2, 4, 8, 16, 32, 64):
+        if (candidate / MINHASH_PERMUTATIONS) ** (1 / candidate) <= threshold:
+            rows = candidate
+    return rows
+
+
+class DuplicateIndex:
+    # The MinHash signatures of the pages of a site in a locality-sensitive hash
+    # index: each signature is cut into bands and the pages that share a band are
+    # the only pairs compared, so near duplicates are found without comparing
+    # every page with every other. Also maps each focus keyword to the pages that
+    # target it. Like LinkGraph, pages keep the stamp of their file so only the
+    # pages whose files changed are updated after loading the previous run.
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self.rows = lsh_rows(threshold)
+        self.signatures = {}  # file -> signature as an array of 32 bit values, or None
+        self.keywords = {}  # file -> focus keyword or None
+        self.stamps = {}  # file -> [modification time, size]
+        # For each band, the bytes of its values -> the file, or the set of files
+        # once more than one page has them. Most bands are unique to a page, and a
+        # set for each would make loading a large site several times slower.
+        self.buckets = [{} for _ in range(MINHASH_PERMUTATIONS // self.rows)]
+        self.pages_by_keyword = {}  # focus keyword -> {file}
+
+    def bands(self, signature):
+        if not signature:
+            return []
+        data = signature.tobytes()
+        size = self.rows * signature.itemsize
+        return [(self.buckets[band], data[band * size:(band + 1) * size])
+                for band in range(len(self.buckets))]
+
+    def update(self, file, signature, keyword, stamp=None):
+        self.remove(file)
+        if signature is not None:
+            signature = array.array('I', signature)
+        self.signatures[file] = signature
+        self.keywords[file] = keyword
+        self.stamps[file] = stamp
+        for buckets, band in self.bands(signature):
+            files = buckets.setdefault(band, file)
+            if isinstance(files, set):
+                files.add(file)
+            elif files != file:
+                buckets[band] = {files, file}
+        if keyword:
+            self.pages_by_keyword.setdefault(keyword, set()).add(file)
+
+    def remove(self, file):
+        if file not in self.signatures:
+            return
+        self.stamps.pop(file)
+        for buckets, band in self.bands(self.signatures.pop(file)):
+            files = buckets[band]
+            if not isinstance(files, set):
+                del buckets[band]
+                continue
+            files.discard(file)
+            if len(files) == 1:
+                buckets[band] = files.pop()
+        keyword = self.keywords.pop(file)
+        if keyword:
+            files = self.pages_by_keyword[keyword]
+            files.discard(file)
+            if not files:
+                del self.pages_by_keyword[keyword]
+
+    def is_current(self, file, stamp):
+        return file in self.signatures and self.stamps[file] == stamp
+
+    def prune(self, files):
+        for file in set(self.signatures) - set(files):
+            self.remove(file)
+
+    def similarity(self, file, other):
+        # The share of equal values estimates the Jaccard similarity of the shingles.
+        return sum(map(int.__eq__, self.signatures[file], self.signatures[other])) / MINHASH_PERMUTATIONS
+
+    def similar_pairs(self):
+        # (file, other, similarity) for every pair at or above the threshold.
+        compared = set()
+        pairs = []
+        for files in itertools.chain.from_iterable(buckets.values() for buckets in self.buckets):
+            if not isinstance(files, set):
+                continue
+            files = sorted(files)
+            for i, file in enumerate(files):
+                for other in files[i + 1:]:
+                    if (file, other) in compared:
+                        continue
+                    compared.add((file, other))
+                    similarity = self.similarity(file, other)
+                    if similarity >= self.threshold:
+                        pairs.append((file, other, similarity))
+        return sorted(pairs)
+
+    def clusters(self):
+        # Groups of pages joined by similar pairs, largest first.
+        parents = {}
+
+        def find(file):
+            while parents.setdefault(file, file) != file:
+                parents[file] = parents[parents[file]]
+                file = parents[file]
+            return file
+
+        pairs = self.similar_pairs()
+        for file, other, similarity in pairs:
+            parents[find(file)] = find(other)
+        groups = {}
+        for file, other, similarity in pairs:
+            groups.setdefault(find(file), []).append(
+                {'files': [file, other], 'similarity': round(similarity, 2)})
+        clusters = []
+        for group in groups.values():
+            files = sorted({file for pair in group for file in pair['files']})
+            clusters.append({'files': files, 'pairs': group})
+        return sorted(clusters, key=lambda cluster: (-len(cluster['files']), cluster['files']))
+
+    def cannibalization(self):
+        # None when no focus keywords were indexed.
+        if not self.pages_by_keyword:
+            return None
+        return [{'keyword': keyword, 'files': sorted(files)}
+                for keyword, files in sorted(self.pages_by_keyword.items()) if len(files) > 1]
+
+    def report(self):
+        return {
+            'pages': len(self.signatures),
+            'threshold': self.threshold,
+            'clusters': self.clusters(),
+            'cannibalization': self.cannibalization(),
+        }
+
+    def to_dict(self):
+        # Signatures are stored as base64 of their little endian 32 bit values.
+        signatures = {}
+        for file, signature in self.signatures.items():
+            if signature is not None:
+                signature = array.array('I', signature)
+                if sys.byteorder == 'big':
+                    signature.byteswap()
+                signature = base64.b64encode(signature.tobytes()).decode('ascii')
+            signatures[file] = signature
+        return {'signatures': signatures, 'keywords': self.keywords, 'stamps': self.stamps}
+
+    @classmethod
+    def from_dict(cls, data, threshold=0.8):
+        # The bands depend on the threshold, so only the signatures are stored and
+        # the buckets are filled again on loading.
+        index = cls(threshold)
+        for file, signature in data['signatures'].items():
+            if signature is not None:
+                signature = array.array('I', base64.b64decode(signature))
+                if sys.byteorder == 'big':
+                    signature.byteswap()
+            index.update(file, signature, data['keywords'][file], data['stamps'][file])
+        return index
+
+
+def update_duplicate_index(index, file, result, error, keyword_pages):
+    # keyword_pages is False when every page has the focus keyword given on the
+    # command line, where pages sharing it says nothing.
+    if error:
+        index.remove(file)
+        return
+    stamp = file_stamp(file)
+    if index.is_current(file, stamp):
+        return
+    keyword = result.focus_keyword.strip().lower() if keyword_pages else None
+    index.update(file, result.fingerprint, keyword, stamp)
+
+
+def load_duplicate_index(path, threshold):
+    if path:
+        try:
+            with open(path, 'r', encoding='utf-8') as index_file:
+                return DuplicateIndex.from_dict(json.load(index_file), threshold)
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+    return DuplicateIndex(threshold)
+
+
+class HTTPError(Exception):
+    pass
+
+
+class ConnectionPool:
+    # Keep-alive HTTP/1.1 connections kept per scheme, host and port, with at most
+    # per_host requests to the same host at a time. Only the status line and the
+    # headers of a response are needed, so small bodies are read and discarded to
+    # keep the connection and anything else closes it. asyncio and ssl are only
+    # imported when links are checked, as importing them slows down every run.
+    MAX_DRAINED_BODY = 64 * 1024
+
+    def __init__(self, per_host=4, timeout=10):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.idle = {}
+        self.limits = {}
+        self.ssl_context = None
+
+    async def request(self, method, url):
+        # Returns the status and the headers, with lower case names.
+        import asyncio
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise HTTPError(f'Unsupported URL "{url}".')
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = urllib.parse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+        limit = self.limits.setdefault(key, asyncio.Semaphore(self.per_host))
+        async with limit:
+            connection = self.idle[key].pop() if self.idle.get(key) else None
+            if connection:
+                try:
+                    return await asyncio.wait_for(
+                        self.send(key, connection, method, target, parts.netloc), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # Closed by the server while it was idle, so try a new connection.
+                    pass
+            return await asyncio.wait_for(
+                self.send(key, None, method, target, parts.netloc), self.timeout)
+
+    async def send(self, key, connection, method, target, host):
+        if connection is None:
+            connection = await self.connect(key)
+        reader, writer = connection
+        try:
+            writer.write((f'{method} {target} HTTP/1.1\r\nHost: {host}\r\n'
+                          f'User-Agent: onpageseo/{__version__}\r\nAccept: */*\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            version, status = lines[0].split(' ', 2)[:2]
+            status = int(status)
+            headers = {}
+            for line in lines[1:]:
+                name, separator, value = line.partition(':')
+                if separator:
+                    headers[name.strip().lower()] = value.strip()
+            reusable = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                        and await self.drain_body(reader, method, status, headers))
+        except BaseException:
+            writer.close()
+            raise
+        if reusable:
+            self.idle.setdefault(key, []).append(connection)
+        else:
+            writer.close()
+        return status, headers
+
+    async def drain_body(self, reader, method, status, headers):
+        # Returns True when the whole body has been read and the connection can be
+        # used again.
+        if method == 'HEAD' or status in (204, 304) or status < 200:
+            return True
+        length = headers.get('content-length')
+        if length is None or not length.isdigit() or int(length) > self.MAX_DRAINED_BODY:
+            return False
+        await reader.readexactly(int(length))
+        return True
+
+    async def connect(self, key):
+        import asyncio
+        import ssl
+        scheme, host, port = key
+        ssl_context = None
+        if scheme == 'https':
+            if self.ssl_context is None:
+                self.ssl_context = ssl.create_default_context()
+            ssl_context = self.ssl_context
+        return await asyncio.open_connection(host, port, ssl=ssl_context)
+
+    def close(self):
+        for connections in self.idle.values():
+            for reader, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+
+class LinkChecker:
+    # Checks URLs concurrently with HEAD requests, falling back to GET for servers
+    # that do not allow HEAD, and follows redirects. Server errors, rate limiting
+    # and network errors are retried with a growing delay.
+    MAX_REDIRECTS = 5
+
+    def __init__(self, concurrency=32, per_host=4, timeout=10, retries=2, retry_delay=0.5):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    def check(self, urls):
+        # Returns {url: {'status': int or None, 'error': str or None}}.
+        import asyncio
+        return asyncio.run(self.check_all(urls))
+
+    async def check_all(self, urls):
+        import asyncio
+        pool = ConnectionPool(self.per_host, self.timeout)
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def check(url):
+            async with limit:
+                return url, await self.check_url(pool, url)
+        try:
+            return dict(await asyncio.gather(*(check(url) for url in urls)))
+        finally:
+            pool.close()
+
+    async def check_url(self, pool, url):
+        import asyncio
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            try:
+                status = await self.fetch(pool, url)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError, ValueError, HTTPError) as e:
+                outcome = {'status': None, 'error': describe_error(e)}
+                if isinstance(e, HTTPError):
+                    return outcome
+                continue
+            outcome = {'status': status, 'error': None}
+            if status != 429 and status < 500:
+                return outcome
+        return outcome
+
+    async def fetch(self, pool, url):
+        method = 'HEAD'
+        for _ in range(self.MAX_REDIRECTS + 1):
+            status, headers = await pool.request(method, url)
+            if method == 'HEAD' and status in (403, 405, 501):
+                method = 'GET'
+                status, headers = await pool.request(method, url)
+            if status in (301, 302, 303, 307, 308) and headers.get('location'):
+                url = urllib.parse.urljoin(url, headers['location'])
+                continue
+            return status
+        raise HTTPError('Too many redirects.')
+
+
+def describe_error(error):
+    import asyncio
+    if isinstance(error, asyncio.TimeoutError):
+        return 'Timed out.'
+    return f'{type(error).__name__}: {error}' if str(error) else type(error).__name__
+
+
+class LinkStatusCache:
+    # Links that worked when they were checked less than ttl hours ago are not
+    # checked again. Broken links are always checked again so a fix shows up on
+    # the next run. The statuses are kept in one JSON file next to the results.
+    def __init__(self, directory, ttl_hours=24):
+        self.path = os.path.join(directory, 'links.json')
+        self.ttl = ttl_hours * 60 * 60
+        self.entries = None
+
+    def load(self):
+        if self.entries is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as cache_file:
+                    self.entries = json.load(cache_file)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    def get(self, url):
+        entry = self.load().get(url)
+        if entry and time.time() - entry['checked'] <= self.ttl:
+            return {'status': entry['status'], 'error': None}
+        return None
+
+    def put(self, url, outcome):
+        if outcome['status'] is not None and outcome['status'] < 400:
+            self.load()[url] = {'status': outcome['status'], 'checked': time.time()}
+
+    def save(self):
+        now = time.time()
+        entries = {url: entry for url, entry in self.load().items()
+                   if now - entry['checked'] <= self.ttl}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as cache_file:
+            json.dump(entries, cache_file, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        with contextlib.suppress(OSError):
+            os.remove(self.path)
+
+
+def external_urls(result):
+    return [link['href'] for link in result.external_links
+            if urllib.parse.urlsplit(link['href']).scheme in ('http', 'https')]
+
+
+def check_links(args, urls):
+    # urls maps each URL to the files that link to it. Every URL is checked once
+    # however many documents use it.
+    cache = None if args.no_cache else LinkStatusCache(args.cache_dir, args.link_cache_ttl)
+    outcomes = {}
+    if cache:
+        for url in urls:
+            outcome = cache.get(url)
+            if outcome:
+                outcomes[url] = outcome
+    cached = len(outcomes)
+    checker = LinkChecker(args.link_concurrency, args.host_concurrency,
+                          args.link_timeout, args.link_retries)
+    for url, outcome in checker.check([url for url in urls if url not in outcomes]).items():
+        outcomes[url] = outcome
+        if cache:
+            cache.put(url, outcome)
+    if cache:
+        cache.save()
+    broken = [{'url': url, 'status': outcome['status'], 'error': outcome['error'],
+               'files': urls[url]}
+              for url, outcome in sorted(outcomes.items())
+              if outcome['status'] is None or outcome['status'] >= 400]
+    return {'checked': len(outcomes), 'cached': cached,
+            'ok': len(outcomes) - len(broken), 'broken': broken}
+
+
+JPEG_SOF_MARKERS = {0xc0, 0xc1, 0xc2, 0xc3, 0xc5, 0xc6, 0xc7,
+                    0xc9, 0xca, 0xcb, 0xcd, 0xce, 0xcf}
+SVG_TAG_RE = re.compile(rb'<svg\b[^>]*>', re.IGNORECASE)
+SVG_SIZE_RE = re.compile(rb'\b(width|height)\s*=\s*["\']\s*(\d+)(?:\.\d+)?(?:px)?\s*["\']')
+
+
+def parse_image_header(data):
+    # Returns (format, width, height) from the first bytes of an image, or
+    # (None, None, None) when the format is not recognized. Only the header is
+    # looked at, so a memory mapped file is never read in full.
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        width, height = struct.unpack('>II', data[16:24])
+        return 'PNG', width, height
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        width, height = struct.unpack('<HH', data[6:10])
+        return 'GIF', width, height
+    if data[:2] == b'\xff\xd8':
+        return ('JPEG',) + jpeg_size(data)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return ('WebP',) + webp_size(data)
+    if data[:2] == b'BM':
+        width, height = struct.unpack('<ii', data[18:26])
+        return 'BMP', width, abs(height)
+    svg = SVG_TAG_RE.search(data[:4096])
+    if svg:
+        size = {name.decode(): int(value) for name, value in SVG_SIZE_RE.findall(svg.group())}
+        return 'SVG', size.get('width'), size.get('height')
+    return None, None, None
+
+
+def jpeg_size(data):
+    # Walks the segments until the start of frame, which holds the dimensions.
+    position = 2
+    while position + 9 < len(data):
+        if data[position] != 0xff:
+            return None, None
+        marker = data[position + 1]
+        if marker == 0xff:
+            position += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[position + 5:position + 9])
+            return width, height
+        if marker == 0x01 or 0xd0 <= marker <= 0xd9:
+            position += 2
+            continue
+        position += 2 + struct.unpack('>H', data[position + 2:position + 4])[0]
+    return None, None
+
+
+def webp_size(data):
+    chunk = data[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3fff, height & 0x3fff
+    if chunk == b'VP8L':
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None, None
+
+
+@functools.lru_cache(maxsize=4096)
+def image_header(path, mtime_ns, size):
+    # Cached by path, modification time and size, so an image used by many
+    # documents is only read once and a changed image is read again.
+    if not size:
+        return None, None, None
+    with open(path, 'rb') as image_file:
+        with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                return parse_image_header(data)
+            except (struct.error, IndexError):
+                return None, None, None
+
+
+def resolve_image(src, file, static_root):
+    # Returns the local path of an image, or None for remote and data: images.
+    # A relative src is looked up next to the Markdown file and then under the
+    # static root, an absolute one under the static root.
+    parts = urllib.parse.urlsplit(src)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = urllib.parse.unquote(parts.path)
+    candidates = [os.path.join(static_root, path.lstrip('/'))]
+    if not path.startswith('/'):
+        candidates.insert(0, os.path.join(os.path.dirname(file), path))
+    return next((candidate for candidate in candidates if os.path.isfile(candidate)),
+                candidates[0])
+
+
+def image_asset(path, focus_keyword, max_bytes, max_width):
+    try:
+        stat = os.stat(path)
+        image_format, width, height = image_header(path, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return {'path': path, 'missing': True}
+    name = re.sub(r'[\W_]+', ' ', os.path.splitext(os.path.basename(path))[0]).lower()
+    keyword = ' '.join(re.findall(r'\w+', focus_keyword.lower()))
+    return {
+        'path': path,
+        'missing': False,
+        'bytes': stat.st_size,
+        'format': image_format,
+        'width': width,
+        'height': height,
+        'oversized': stat.st_size > max_bytes or (width or 0) > max_width,
+        'keyword_in_name': bool(keyword) and f' {keyword} ' in f' {name} ',
+    }
+
+
+# Created on first use, like the analyzers. Reading image headers waits on the
+# disk, so threads are enough to overlap the reads.
+_image_pool = None
+
+
+def image_pool():
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4))
+    return _image_pool
+
+
+def audit_images(result, file, static_root='.', max_bytes=500 * 1024, max_width=2400):
+    # Adds an 'asset' entry with the size, dimensions and format of the local file
+    # to every image of result whose src is a local path.
+    local = [(image, resolve_image(image['src'], file, static_root)) for image in result.images]
+    local = [(image, path) for image, path in local if path]
+    assets = image_pool().map(
+        lambda path: image_asset(path, result.focus_keyword, max_bytes, max_width),
+        [path for image, path in local])
+    for (image, path), asset in zip(local, assets):
+        image['asset'] = asset
+    return result
+
+
 def separator_length(a_string, target_length):
     number_of_repeats = target_length // len(a_string) + 1
     a_string_repeated = '\n' + a_string * number_of_repeats
@@ -34,15 +2233,23 @@ def sub_section_heading(heading):
     return final_heading
 
 
-def main():
+def file_heading(heading):
+    section = '\n' + heading
+    section_divider = separator_length('#', 80)
+    final_heading = section + section_divider
+    return final_heading
+
+
+def build_parser():
     parser = argparse.ArgumentParser(
         description='Reviews the  SEO of a Markdown document')
 
     # Required/Positional arguments
-    parser.add_argument('file', help='The file to be analyzed.')
+    parser.add_argument(
+        'file', nargs='?', help='The file to be analyzed. A directory or a quoted glob pattern such as "content/**/*.md" analyzes every Markdown file it matches.')
 
     parser.add_argument(
-        'domain', help='The domain used to check if links are internal or external.')
+        'domain', nargs='?', help='The domain used to check if links are internal or external.')
 
     # Sub commands for documents with and without front matter
     subparsers = parser.add_subparsers(
@@ -61,62 +2268,961 @@ def main():
     # Arguments for documents without front matter
     parser_no_fm.add_argument(
         'focus_keyword', help='Manually add the focus keyword when there is no front matter.')
+    parser_no_fm.add_argument(
+        '-k', '--keywords', default='', help='Comma separated secondary keywords to report on alongside the focus keyword.')
     parser_no_fm.add_argument(
         '-t', '--title', help='Manually enter the title used for your content.')
     parser_no_fm.add_argument(
         '-d', '--desc', help='Manually enter the meta description. Default: Use the first 160 characters of the first paragraph to determine the meta description if one not entered.')
 
-    # [Placeholder] Optional arguments
+    # Optional arguments
+    parser.add_argument(
+        '-w', '--workers', type=int, default=os.cpu_count(), help='Number of worker processes used when FILE is a directory or glob pattern. Default: the number of CPUs.')
+    parser.add_argument(
+        '-b', '--backend', choices=['tree', 'soup'], default='tree', help='How the converted document is analyzed. "tree" reads the ElementTree built by Python-Markdown directly, "soup" re-parses the HTML with BeautifulSoup and also sees raw HTML embedded in the Markdown. Default: tree.')
+    parser.add_argument(
+        '--checks', help='Comma separated checks to run, for example "title,meta-description". Only the parts of the document these checks need are extracted. Default: every check. See --list-checks.')
+    parser.add_argument(
+        '--skip', default='', help='Comma separated checks not to run.')
+    parser.add_argument(
+        '--list-checks', action='store_true', help='List the available checks, including those installed by other packages, and exit.')
+    parser.add_argument(
+        '--whole-words', action='store_true', help='Only find keywords in the title, meta description, headings and alt text as whole words, so "seo" does not match "seoul". Keyword counts are always whole words.')
+    parser.add_argument(
+        '--case-sensitive', action='store_true', help='Match keywords with the same capitalization only.')
+    parser.add_argument(
+        '--count-scope', choices=['paragraphs', 'all'], default='paragraphs', help='Where words and keywords are counted. "all" counts headings and list items as well as paragraphs. Default: paragraphs.')
+    parser.add_argument(
+        '--chunksize', type=int, default=8, help='Number of files handed to a worker process at a time in batch mode. Default: 8.')
+    parser.add_argument(
+        '-f', '--format', choices=['text', 'json', 'ndjson'], default='text', help='Output format. "json" writes one JSON document, "ndjson" one JSON record per line as each file is analyzed. Neither contains color codes. Default: text.')
+    parser.add_argument(
+        '--link-graph', action='store_true', help='When FILE is a directory or glob pattern, resolve the links between its pages and report broken internal links, orphan pages and how many clicks each page is from the home page. Page URLs come from a permalink, url or slug front matter field or the path of the file.')
+    parser.add_argument(
+        '--home-url', default='/', help='URL of the home page used for --link-graph click depths. Default: /.')
+    parser.add_argument(
+        '--duplicates', action='store_true', help='When FILE is a directory or glob pattern, find groups of near duplicate pages from MinHash signatures of their text, and with fm pages that share a focus keyword. The index is stored with the cached results so later runs only update the pages that changed.')
+    parser.add_argument(
+        '--similarity', type=float, default=0.8, help='Estimated share of shared 4 word runs at which --duplicates reports two pages as near duplicates. Default: 0.8.')
+    parser.add_argument(
+        '--check-links', action='store_true', help='Check that every external link responds, with concurrent HEAD requests. Each URL is checked once per run however many documents use it, and URLs that worked are not checked again for --link-cache-ttl hours.')
+    parser.add_argument(
+        '--link-timeout', type=float, default=10, help='Seconds to wait for each request of --check-links. Default: 10.')
+    parser.add_argument(
+        '--link-retries', type=int, default=2, help='Times a link is checked again after a network error, a server error or rate limiting. Default: 2.')
+    parser.add_argument(
+        '--link-concurrency', type=int, default=32, help='Links checked at the same time. Default: 32.')
+    parser.add_argument(
+        '--host-concurrency', type=int, default=4, help='Links checked at the same time on any one host. Default: 4.')
+    parser.add_argument(
+        '--link-cache-ttl', type=float, default=24, help='Hours a link that worked is not checked again. Default: 24.')
+    parser.add_argument(
+        '--audit-images', action='store_true', help='Look up the file of every local image and report its size, dimensions and format, whether it is missing or oversized, and whether the focus keyword is in its name. Dimensions are read from the file header only.')
+    parser.add_argument(
+        '--static-root', default='.', help='Directory that image paths starting with / are relative to, and where relative paths are looked for when they are not next to the document. Default: the current directory.')
+    parser.add_argument(
+        '--max-image-kb', type=float, default=500, help='Images larger than this many KB are reported as oversized. Default: 500.')
+    parser.add_argument(
+        '--max-image-width', type=int, default=2400, help='Images wider than this many pixels are reported as oversized. Default: 2400.')
+    parser.add_argument(
+        '--stream-above', type=float, default=16, metavar='MB', help='Analyze files larger than this many MB a block at a time instead of reading them into memory, so memory use stays about the same however large the file is. 0 streams every file. Default: 16.')
+    parser.add_argument(
+        '--profile', action='store_true', help='Record the time, peak memory allocated and elements visited while reading, converting and parsing each document and while running each check. Reported after each document and summed over a batch. Results are not read from or written to the cache.')
+    parser.add_argument(
+        '--no-cache', action='store_true', help='Analyze every file instead of reusing results stored for unchanged files.')
+    parser.add_argument(
+        '--cache-dir', default=default_cache_dir(), help='Directory where analysis results are stored. Default: ~/.cache/onpageseo.')
+    parser.add_argument(
+        '--cache-max-age', type=float, default=30, help='Remove stored results that have not been used for this many days. Default: 30.')
+    parser.add_argument(
+        '--cache-max-size', type=float, default=100, help='Remove the least recently used results when the cache grows past this many MB. Default: 100.')
+    parser.add_argument(
+        '--clear-cache', action='store_true', help='Remove every stored result before running. FILE and DOMAIN may be left out to only clear the cache.')
+    parser.add_argument(
+        '--serve', nargs='?', const=default_server_address(), metavar='ADDRESS', help='Keep running and answer requests from onpageseo_client.py, so Python, Markdown and BeautifulSoup are only loaded once. ADDRESS is a Unix socket path or HOST:PORT, where HOST is 127.0.0.1, ::1 or localhost. Default: ' + default_server_address())
 
-    args = parser.parse_args()
+    return parser
 
-    file = args.file
-    domain = args.domain
 
-    md = markdown.Markdown(extensions=['meta'])
-    with open(file, 'r', encoding='utf-8') as input_file:
-        text = input_file.read()
-    html = md.convert(text)
-    front_matter = md.Meta
-    post = BeautifulSoup(html, 'html.parser')
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.serve:
+        serve(args.serve, parser)
+    else:
+        run(parser, args)
 
-    if args.front_matter == 'fm':
-        keywords = md.Meta[args.kw_lookup.lower()][0]
-        primary = keywords.split(',')
-        focus_keyword = primary[0]
 
+def run(parser, args):
+    if args.list_checks:
+        for name, check in get_checks().items():
+            print(f'{name:<20}{check.section}')
+        return
+    if args.clear_cache:
+        removed = result_cache(args, clear=True).clear()
+        LinkStatusCache(args.cache_dir).clear()
+        print('Removed ' + str(removed) + ' cached result(s).')
+        if args.file is None:
+            return
+    if args.file is None or args.domain is None:
+        parser.error('the following arguments are required: file, domain')
+    if args.front_matter is None:
+        parser.error('choose fm or no_fm to say whether the document has front matter')
+    if args.backend == 'soup' and BeautifulSoup is None:
+        parser.error('the soup backend requires BeautifulSoup4 to be installed')
+    try:
+        selected_checks(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    files = collect_files(args.file)
+    single = len(files) == 1 and files[0] == args.file
+    if single and args.link_graph:
+        parser.error('--link-graph needs a directory or glob pattern')
+    if single and args.duplicates:
+        parser.error('--duplicates needs a directory or glob pattern')
+    if not 0 < args.similarity <= 1:
+        parser.error('--similarity must be more than 0 and at most 1')
+    try:
+        if single:
+            review(args.file, args)
+        else:
+            review_batch(files, args)
+    finally:
+        # Tracing slows every allocation down, so do not leave it on in a server.
+        if args.profile and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def default_server_address():
+    # The client has its own copy of this so it does not have to import this module.
+    return os.path.join(tempfile.gettempdir(), 'onpageseo-' + str(os.getuid()) + '.sock')
+
+
+def parse_server_address(address):
+    # 'HOST:PORT' or ':PORT' is a TCP address, anything else a Unix socket path.
+    # An IPv6 host may be written in brackets, as in '[::1]:8000'.
+    host, separator, port = address.rpartition(':')
+    if separator and port.isdigit() and os.sep not in address:
+        return host.strip('[]') or '127.0.0.1', int(port)
+    return address
+
+
+def is_loopback(host):
+    # The server has no authentication and reads any file a client names, so it
+    # only listens on this machine.
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ReportRequestHandler(socketserver.StreamRequestHandler):
+    # One request per connection: a JSON line with the command line arguments and
+    # working directory of the client, answered with a JSON line holding the report.
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            status, output = run_request(
+                self.server.parser, request['argv'], request.get('cwd'))
+        except (ValueError, KeyError, TypeError) as e:
+            status, output = 2, f'Invalid request: {e}\n'
+        response = json.dumps({'status': status, 'output': output})
+        self.wfile.write(response.encode('utf-8') + b'\n')
+
+
+class UnixReportServer(socketserver.UnixStreamServer):
+    pass
+
+
+class TCPReportServer(socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+class TCP6ReportServer(TCPReportServer):
+    address_family = socket.AF_INET6
+
+
+def run_request(parser, argv, cwd=None):
+    # Runs one command line inside the server and returns its exit status and
+    # everything it printed. Requests are handled one at a time, so changing into
+    # the client's working directory is safe.
+    output = io.StringIO()
+    status = 0
+    previous_cwd = os.getcwd()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            if cwd:
+                os.chdir(cwd)
+            args = parser.parse_args(argv)
+            if args.serve:
+                parser.error('--serve cannot be sent to a running server')
+            run(parser, args)
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        output.write(f'{type(e).__name__}: {e}\n')
+        status = 1
+    finally:
+        os.chdir(previous_cwd)
+    return status, output.getvalue()
+
+
+def serve(address, parser):
+    address = parse_server_address(address)
+    if isinstance(address, tuple):
+        if not is_loopback(address[0]):
+            parser.error('--serve only listens on 127.0.0.1, ::1 or localhost, as the server '
+                         'has no authentication and reads any file a client asks for')
+        server_class = TCP6ReportServer if ':' in address[0] else TCPReportServer
+        server = server_class(address, ReportRequestHandler)
     else:
-        focus_keyword = args.focus_keyword
+        # Only a socket left behind by an earlier server is replaced, never a file
+        # given to --serve by mistake.
+        if os.path.lexists(address):
+            if not stat.S_ISSOCK(os.lstat(address).st_mode):
+                parser.error('--serve ' + address + ' already exists and is not a socket')
+            os.remove(address)
+        server = UnixReportServer(address, ReportRequestHandler)
+        os.chmod(address, 0o600)
+    server.parser = parser
+
+    # Build the analyzers now so the first request does not pay for loading the
+    # Markdown extensions.
+    for backend in ['tree', 'soup'] if BeautifulSoup else ['tree']:
+        get_analyzer(backend).analyze('# Title\n\nText.', 'example.com', focus_keyword='text')
+
+    # Stop cleanly, removing the socket file, when the server is terminated.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print('Listening on ' + str(address) + '. Press Ctrl+C to stop.', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if not isinstance(address, tuple) and os.path.exists(address):
+            os.remove(address)
+
+
+def collect_files(path):
+    # A directory is walked for Markdown files, a pattern such as 'content/**/*.md'
+    # is expanded, anything else is treated as a single file.
+    if os.path.isdir(path):
+        files = []
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            for name in sorted(names):
+                if name.lower().endswith(MARKDOWN_EXTENSIONS):
+                    files.append(os.path.join(root, name))
+        return files
+    if glob.has_magic(path):
+        return sorted(f for f in glob.glob(path, recursive=True) if os.path.isfile(f))
+    return [path]
+
+
+def front_matter_field(front_matter, name, all_values=False):
+    values = front_matter.get(name.lower())
+    if not values:
+        raise ValueError(f'The front matter field "{name}" was not found.')
+    return ','.join(values) if all_values else values[0]
+
+
+def split_keywords(keywords):
+    return [k.strip() for k in keywords.split(',') if k.strip()]
+
+
+def density(count, word_count):
+    return round(count / word_count * 100, 2) if word_count else 0
+
 
-    # If there is front matter the 'title' will be used instead.
+def analysis_options(args):
+    # Maps the fm/no_fm command line arguments onto the keyword arguments of analyze().
+    options = {'ignore_case': not args.case_sensitive, 'whole_words': args.whole_words,
+               'count_scope': args.count_scope}
     if args.front_matter == 'fm':
-        title = front_matter['title'][0]
-    elif args.title:
-        title = args.title
-        print(args.title)
+        options.update(kw_lookup=args.kw_lookup, desc_lookup=args.desc_lookup)
+    else:
+        options.update(focus_keyword=args.focus_keyword, title=args.title,
+                       description=args.desc, keywords=split_keywords(args.keywords))
+    options.update(checks=selected_checks(args), fingerprint=args.duplicates)
+    return options
+
+
+def selected_checks(args):
+    # The names of the checks to run, or None for all of them. The link and image
+    # options need the checks that collect links and images.
+    if args.checks is None and not args.skip:
+        return None
+    names = set(split_keywords(args.checks) if args.checks is not None else get_checks())
+    names -= set(split_keywords(args.skip))
+    if args.link_graph or args.check_links:
+        names.add('links')
+    if args.audit_images:
+        names.add('images')
+    return [check.name for check in select_checks(names)]
+
+
+def result_cache(args, clear=False):
+    # A profile is only meaningful for a document that was actually analyzed.
+    if (args.no_cache or args.profile) and not clear:
+        return None
+    return ResultCache(args.cache_dir, args.cache_max_age, args.cache_max_size)
+
+
+def analyze_file(file, args, cache=None, profiler=NULL_PROFILER):
+    # Returns the Result and whether it was served from the cache. On a cache hit
+    # the Markdown parser is never created. Files larger than --stream-above are
+    # never read into memory whole.
+    stream = os.path.getsize(file) > args.stream_above * 1024 * 1024
+    if not stream:
+        with profiler.phase('Read'):
+            with open(file, 'rb') as input_file:
+                data = input_file.read()
+    options = analysis_options(args)
+    result = None
+    if cache:
+        cache_options = dict(options, domain=args.domain, backend=args.backend)
+        key = cache.key_file(file, cache_options) if stream else cache.key(data, cache_options)
+        result = cache.get(key)
+    cached = result is not None
+    if cached:
+        result.file = file
+    else:
+        analyzer = get_analyzer(args.backend)
+        if stream:
+            result = analyze_stream_file(analyzer, file, args.domain, profiler, options)
+        else:
+            result = analyzer.analyze(data.decode('utf-8'), args.domain, file=file,
+                                      profiler=profiler, **options)
+        if cache:
+            cache.put(key, result)
+    # The image files can change without the document changing, so they are looked
+    # at after the cached result has been stored.
+    if args.audit_images:
+        audit_images(result, file, args.static_root, args.max_image_kb * 1024,
+                     args.max_image_width)
+    return result, cached
+
+
+def analyze_stream_file(analyzer, file, domain, profiler, options):
+    # Two passes over the file: one for the reference-style link definitions, which
+    # can come after the links that use them, and one to analyze it.
+    with profiler.phase('Read'):
+        with open(file, 'r', encoding='utf-8') as input_file:
+            references = reference_definitions(input_file)
+    with open(file, 'r', encoding='utf-8') as input_file:
+        return analyzer.analyze_stream(input_file, domain, file=file, profiler=profiler,
+                                       references=references, **options)
+
+
+def new_profiler(args):
+    return Profiler() if args.profile else NULL_PROFILER
+
+
+def review(file, args):
+    cache = result_cache(args)
+    profiler = new_profiler(args)
+    result, cached = analyze_file(file, args, cache, profiler)
+    link_check = None
+    if args.check_links:
+        link_check = check_links(args, {url: [file] for url in external_urls(result)})
+    cache_stats = None
+    if cache:
+        cache_stats = {'hits': int(cached), 'misses': int(not cached),
+                       'evictions': cache.prune()}
+    writer = report_writer(args, batch=False)
+    writer.document(file, result, None, profiler.to_dict(), link_check, cache_stats)
+    writer.close()
+    return result
+
+
+def review_file(file, args):
+    # Worker entry point for batch mode. Errors are returned instead of raised so
+    # one broken document does not stop the whole run. The profile of a document
+    # that failed covers the phases that ran.
+    profiler = new_profiler(args)
+    try:
+        result, cached = analyze_file(file, args, result_cache(args), profiler)
+        return file, result, None, cached, profiler.to_dict()
+    except Exception as e:
+        return file, None, f'{type(e).__name__}: {e}', False, profiler.to_dict()
+
+
+def review_batch(files, args):
+    summary = SiteSummary()
+    writer = report_writer(args, batch=True)
+    graph = None
+    if args.link_graph:
+        # The graph of the previous run is stored with the cache, so only the
+        # pages that changed since are resolved again.
+        root = batch_root(args.file)
+        graph_path = None if args.no_cache else site_index_path(args, 'graphs')
+        graph = load_link_graph(graph_path)
+    duplicates = None
+    if args.duplicates:
+        duplicates_path = None if args.no_cache else site_index_path(args, 'duplicates')
+        duplicates = load_duplicate_index(duplicates_path, args.similarity)
+    # External URLs and the files that use them, checked once the run is over.
+    urls = {}
+    for file, result, error, cached, profile in review_files(files, args):
+        writer.document(file, result, error, profile)
+        summary.add(file, result, error, cached, profile)
+        if graph is not None:
+            update_link_graph(graph, file, result, error, root)
+        if duplicates is not None:
+            update_duplicate_index(duplicates, file, result, error, args.front_matter == 'fm')
+        if args.check_links and result:
+            for url in dict.fromkeys(external_urls(result)):
+                urls.setdefault(url, []).append(file)
+    if args.check_links:
+        summary.link_check = check_links(args, urls)
+    if graph is not None:
+        graph.prune(files)
+        summary.link_graph = graph.report(args.home_url)
+        if graph_path:
+            save_site_index(graph, graph_path)
+    if duplicates is not None:
+        duplicates.prune(files)
+        summary.duplicates = duplicates.report()
+        if duplicates_path:
+            save_site_index(duplicates, duplicates_path)
+    cache = result_cache(args)
+    if cache:
+        summary.cache_evictions = cache.prune()
+    writer.summary(summary)
+    writer.close()
+
+
+def review_files(files, args):
+    # Yields the reviews in file order as they finish. Files are handed to the pool
+    # a window at a time so finished results never pile up in memory waiting for
+    # a slow document.
+    if args.workers < 2 or len(files) < 2:
+        for file in files:
+            yield review_file(file, args)
+        return
+    chunksize = max(1, args.chunksize)
+    window = args.workers * chunksize * 4
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for start in range(0, len(files), window):
+            batch = files[start:start + window]
+            yield from executor.map(review_file, batch, itertools.repeat(args),
+                                    chunksize=chunksize)
+
+
+def report_writer(args, batch):
+    if args.format == 'ndjson':
+        return NDJSONWriter(sys.stdout)
+    if args.format == 'json':
+        return JSONWriter(sys.stdout, batch)
+    return TextWriter(batch)
+
+
+class TextWriter:
+    # The colored report meant to be read in a terminal.
+    def __init__(self, batch):
+        self.batch = batch
+
+    def document(self, file, result, error, profile=None, link_check=None, cache=None):
+        if self.batch:
+            print(file_heading(file))
+        if error:
+            print(bcolors.FAIL + 'Unable to analyze this file. ' + error + bcolors.RESET)
+        else:
+            print_report(result)
+        if link_check:
+            print_link_check(link_check, batch=False)
+        if profile:
+            print(section_heading('Profile'))
+            print_profile_table(
+                [(phase['phase'], phase['seconds'], phase['peak_bytes'], phase['elements'])
+                 for phase in profile['phases']], profile['seconds'])
+        if cache:
+            print(section_heading('Cache'))
+            print_cache(cache)
+
+    def summary(self, summary):
+        summary.print()
+
+    def close(self):
+        pass
+
+
+def document_record(file, result, error, profile=None, link_check=None, cache=None):
+    if error:
+        record = {'type': 'error', 'file': file, 'error': error}
+    else:
+        record = {'type': 'document', **result_to_dict(result)}
+    if profile:
+        record['profile'] = profile
+    if link_check:
+        record['link_check'] = link_check
+    if cache:
+        record['cache'] = cache
+    return record
+
+
+class NDJSONWriter:
+    # One compact JSON record per line, written as soon as each document has been
+    # analyzed: 'document' and 'error' records, then a final 'summary' record.
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def document(self, file, result, error, profile=None, link_check=None, cache=None):
+        self.write(document_record(file, result, error, profile, link_check, cache))
+
+    def summary(self, summary):
+        self.write({'type': 'summary', **summary.to_dict()})
+
+    def close(self):
+        self.stream.flush()
+
+
+class JSONWriter:
+    # A single JSON document. For one file it is the document record, for a batch an
+    # object with the list of document records and the summary. The list is
+    # written record by record so it is never held in memory.
+    def __init__(self, stream, batch):
+        self.stream = stream
+        self.batch = batch
+        self.count = 0
+
+    def document(self, file, result, error, profile=None, link_check=None, cache=None):
+        record = json.dumps(document_record(file, result, error, profile, link_check, cache),
+                            separators=(',', ':'))
+        if not self.batch:
+            self.stream.write(record)
+            return
+        self.stream.write(('{"documents":[' if self.count == 0 else ',') + record)
+        self.count += 1
+
+    def summary(self, summary):
+        if self.count == 0:
+            self.stream.write('{"documents":[')
+        self.stream.write('],"summary":' + json.dumps(summary.to_dict(), separators=(',', ':')) + '}')
+
+    def close(self):
+        self.stream.write('\n')
+        self.stream.flush()
+
+
+# Label, the check that provides the value and the test. Only counted for the
+# documents the check ran on.
+SUMMARY_CHECKS = [
+    ('Title longer than 60 characters', 'title', lambda r: r.title_length > 60),
+    ('Focus keyword missing from the title', 'title', lambda r: not r.keyword_in_title),
+    ('Focus keyword missing from the meta description', 'meta-description',
+     lambda r: not r.keyword_in_meta_description),
+    ('Word count below 300', 'word-count', lambda r: r.word_count < 300),
+    ('Keyword density below 0.75%', 'keywords', lambda r: r.keyword_density < .75),
+    ('No images', 'images', lambda r: len(r.images) < 1),
+    ('No links', 'links', lambda r: len(r.links) < 1),
+    ('Flesch Reading Ease below 30', 'readability',
+     lambda r: r.readability['words'] > 0 and r.readability['flesch_reading_ease'] < 30),
+]
+# The per document readability metrics summed up over a site, with their labels.
+READABILITY_METRICS = {
+    'flesch_reading_ease': 'Flesch Reading Ease',
+    'flesch_kincaid_grade': 'Flesch-Kincaid grade',
+    'sentence_length': 'Words per sentence',
+    'paragraph_length': 'Words per paragraph',
+}
+READABILITY_PERCENTILES = [10, 25, 50, 75, 90]
+READABILITY_OUTLIERS = 10
+
+
+def readability_metrics(counts):
+    # counts are (words, sentences, syllables, paragraphs) for each document.
+    # Returns each metric for every document: with NumPy as one vectorized pass
+    # over arrays of the counts, else a document at a time.
+    numpy = get_numpy()
+    if numpy is not None:
+        words, sentences, syllables, paragraphs = numpy.array(counts, dtype=float).T
+        ease, grade = readability_scores(words, sentences, syllables)
+        return dict(zip(READABILITY_METRICS,
+                        [ease, grade, words / sentences, words / paragraphs]))
+    rows = [readability_scores(words, sentences, syllables) +
+            (words / sentences, words / paragraphs)
+            for words, sentences, syllables, paragraphs in counts]
+    return dict(zip(READABILITY_METRICS, map(list, zip(*rows))))
+
+
+def percentiles(values, points):
+    # Linear interpolation between the closest ranks, as numpy.percentile().
+    numpy = get_numpy()
+    if numpy is not None:
+        return numpy.percentile(values, points).tolist()
+    values = sorted(values)
+    result = []
+    for point in points:
+        position = (len(values) - 1) * point / 100
+        lower = int(position)
+        upper = min(lower + 1, len(values) - 1)
+        result.append(values[lower] + (values[upper] - values[lower]) * (position - lower))
+    return result
+
+
+def site_readability(files, counts):
+    # Percentiles of every metric over the site, and the documents whose reading
+    # ease is outside the usual 1.5 interquartile ranges around the middle half.
+    metrics = readability_metrics(counts)
+    summary = {'documents': len(files)}
+    for name, values in metrics.items():
+        summary[name] = {'p' + str(point): round(value, 1) for point, value in
+                         zip(READABILITY_PERCENTILES, percentiles(values, READABILITY_PERCENTILES))}
+    ease, grade = metrics['flesch_reading_ease'], metrics['flesch_kincaid_grade']
+    q1, q3 = percentiles(ease, [25, 75])
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    numpy = get_numpy()
+    if numpy is not None:
+        indices = numpy.flatnonzero((ease < low) | (ease > high)).tolist()
+    else:
+        indices = [i for i, value in enumerate(ease) if value < low or value > high]
+    summary['outliers'] = sorted(
+        ({'file': files[i], 'flesch_reading_ease': round(float(ease[i]), 1),
+          'flesch_kincaid_grade': round(float(grade[i]), 1), 'harder': bool(ease[i] < low)}
+         for i in indices), key=lambda outlier: outlier['flesch_reading_ease'])
+    return summary
+
+
+class SiteSummary:
+    # Running totals for a batch run, so results can be discarded once printed.
+    def __init__(self):
+        self.checked = 0
+        self.analyzed = 0
+        # The documents the word count and the keyword density were measured on.
+        self.counted = 0
+        self.total_words = 0
+        self.keyword_counted = 0
+        self.total_density = 0
+        self.failed_checks = {}
+        self.errors = []
+        self.cache_hits = 0
+        self.cache_evictions = None
+        self.profiled = 0
+        self.phase_totals = {}
+        self.slowest = []
+        self.link_graph = None
+        self.link_check = None
+        self.duplicates = None
+        self.image_audit = None
+        self.readability_files = []
+        self.readability_counts = []
+
+    def add(self, file, result, error, cached=False, profile=None):
+        self.checked += 1
+        self.cache_hits += cached
+        if profile:
+            self.add_profile(file, profile)
+        if error:
+            self.errors.append((file, error))
+            return
+        self.analyzed += 1
+        if 'word-count' in result.checks or 'keywords' in result.checks:
+            self.counted += 1
+            self.total_words += result.word_count
+        assets = [image['asset'] for image in result.images or [] if 'asset' in image]
+        if assets:
+            self.add_image_assets(assets)
+        if 'keywords' in result.checks:
+            self.keyword_counted += 1
+            self.total_density += result.keyword_density
+        readability = result.readability
+        if readability and readability['words']:
+            self.readability_files.append(file)
+            self.readability_counts.append((readability['words'], readability['sentences'],
+                                            readability['syllables'], readability['paragraphs']))
+        for label, check, failed in SUMMARY_CHECKS:
+            if check in result.checks:
+                self.failed_checks[label] = self.failed_checks.get(label, 0) + failed(result)
+
+    def add_image_assets(self, assets):
+        if self.image_audit is None:
+            self.image_audit = {'images': 0, 'missing': 0, 'oversized': 0,
+                                'keyword_not_in_name': 0, 'total_bytes': 0}
+        audit = self.image_audit
+        for asset in assets:
+            audit['images'] += 1
+            if asset['missing']:
+                audit['missing'] += 1
+                continue
+            audit['oversized'] += asset['oversized']
+            audit['keyword_not_in_name'] += not asset['keyword_in_name']
+            audit['total_bytes'] += asset['bytes']
+
+    def add_profile(self, file, profile):
+        # Phase totals over the run, plus a heap of the slowest documents so only
+        # PROFILE_SLOWEST of them are ever kept.
+        self.profiled += 1
+        for phase in profile['phases']:
+            totals = self.phase_totals.setdefault(phase['phase'], {
+                'seconds': 0.0, 'max_seconds': 0.0, 'max_file': None,
+                'peak_bytes': 0, 'elements': 0})
+            totals['seconds'] += phase['seconds']
+            totals['elements'] += phase['elements']
+            totals['peak_bytes'] = max(totals['peak_bytes'], phase['peak_bytes'])
+            if phase['seconds'] > totals['max_seconds']:
+                totals['max_seconds'] = phase['seconds']
+                totals['max_file'] = file
+        entry = (profile['seconds'], file)
+        if len(self.slowest) < PROFILE_SLOWEST:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+
+    def profile_to_dict(self):
+        phases = {name: self.phase_totals[name]
+                  for name in sorted(self.phase_totals, key=phase_order)}
+        return {
+            'documents': self.profiled,
+            'seconds': sum(totals['seconds'] for totals in phases.values()),
+            'phases': phases,
+            'slowest': [{'file': file, 'seconds': seconds}
+                        for seconds, file in sorted(self.slowest, reverse=True)],
+        }
+
+    def cache_to_dict(self):
+        return {'hits': self.cache_hits, 'misses': self.checked - self.cache_hits,
+                'evictions': self.cache_evictions}
+
+    def to_dict(self):
+        summary = {
+            'checked': self.checked,
+            'analyzed': self.analyzed,
+            'errors': len(self.errors),
+        }
+        # Only the totals of the checks that ran, so a skipped check never reads as 0.
+        if self.counted:
+            summary['total_words'] = self.total_words
+            summary['average_word_count'] = round(self.total_words / self.counted)
+        if self.keyword_counted:
+            summary['average_keyword_density'] = round(self.total_density / self.keyword_counted, 2)
+        summary['failed_checks'] = self.failed_checks
+        if self.cache_evictions is not None:
+            summary['cache'] = self.cache_to_dict()
+        if self.profiled:
+            summary['profile'] = self.profile_to_dict()
+        if self.link_graph:
+            summary['link_graph'] = self.link_graph
+        if self.link_check:
+            summary['link_check'] = self.link_check
+        if self.duplicates:
+            summary['duplicates'] = self.duplicates
+        if self.image_audit:
+            summary['image_audit'] = self.image_audit
+        if self.readability_files:
+            summary['readability'] = site_readability(self.readability_files,
+                                                      self.readability_counts)
+        return summary
+
+    def print(self):
+        print(section_heading('Site Summary'))
+        print(str(self.checked) + ' file(s) checked, ' + str(self.analyzed) +
+              ' analyzed and ' + str(len(self.errors)) + ' with errors.')
+        if self.counted:
+            print('Total word count: ' + str(self.total_words))
+            print('Average word count: ' +
+                  str(round(self.total_words / self.counted)))
+        if self.keyword_counted:
+            average_density = self.total_density / self.keyword_counted
+            print('Average keyword density: ' +
+                  str(round(average_density, 2)) + '%')
+        if self.analyzed:
+            for label, count in self.failed_checks.items():
+                color = bcolors.FAIL if count else bcolors.OK
+                print(color + label + ': ' + str(count) + bcolors.RESET)
+        if self.errors:
+            print(sub_section_heading('Files with Errors'))
+            for file, error in self.errors:
+                print(bcolors.FAIL + file + ': ' + error + bcolors.RESET)
+        if self.cache_evictions is not None:
+            print(sub_section_heading('Cache'))
+            print_cache(self.cache_to_dict())
+        if self.image_audit:
+            audit = self.image_audit
+            print(sub_section_heading('Image Files'))
+            print(str(audit['images']) + ' local image(s), ' +
+                  str(round(audit['total_bytes'] / 1024 / 1024, 1)) + ' MB in total.')
+            for label, key in [('Missing image files', 'missing'), ('Oversized images', 'oversized'),
+                               ('Focus keyword missing from the file name', 'keyword_not_in_name')]:
+                color = bcolors.FAIL if audit[key] else bcolors.OK
+                print(color + label + ': ' + str(audit[key]) + bcolors.RESET)
+        if self.readability_files:
+            print_site_readability(site_readability(self.readability_files,
+                                                    self.readability_counts))
+        if self.link_graph:
+            print_link_graph(self.link_graph)
+        if self.link_check:
+            print_link_check(self.link_check, batch=True)
+        if self.duplicates:
+            print_duplicates(self.duplicates)
+        if self.profiled:
+            profile = self.profile_to_dict()
+            print(sub_section_heading('Profile'))
+            print(str(self.profiled) + ' document(s) profiled. Peak KiB is the largest of any document.')
+            print_profile_table(
+                [(name, totals['seconds'], totals['peak_bytes'], totals['elements'])
+                 for name, totals in profile['phases'].items()], profile['seconds'])
+            print(sub_section_heading('Slowest Documents'))
+            for document in profile['slowest']:
+                print(format(document['seconds'], '.4f') + 's ' + document['file'])
+
+
+def print_site_readability(report):
+    print(sub_section_heading('Readability'))
+    print(str(report['documents']) + ' document(s) scored.')
+    print(f'{"":<24}{"10%":>8}{"25%":>8}{"Median":>8}{"75%":>8}{"90%":>8}')
+    for name, label in READABILITY_METRICS.items():
+        print(f'{label:<24}' + ''.join(f'{value:>8.1f}' for value in report[name].values()))
+    print(sub_section_heading('Readability Outliers'))
+    if not report['outliers']:
+        print(bcolors.OK + 'No document is much harder or easier to read than the rest.' + bcolors.RESET)
+    for outlier in report['outliers'][:READABILITY_OUTLIERS]:
+        color = bcolors.FAIL if outlier['harder'] else bcolors.WARNING
+        print(color + outlier['file'] + ': Flesch Reading Ease ' +
+              str(outlier['flesch_reading_ease']) + ', grade ' +
+              str(outlier['flesch_kincaid_grade']) + bcolors.RESET)
+    if len(report['outliers']) > READABILITY_OUTLIERS:
+        print('...and ' + str(len(report['outliers']) - READABILITY_OUTLIERS) + ' more.')
+
+
+def print_link_graph(report):
+    print(section_heading('Internal Link Graph'))
+    print(str(report['pages']) + ' page(s) with ' + str(report['links']) + ' link(s) to pages of the site.')
+    most_linked = sorted((item for item in report['graph'].items() if item[1]['inbound']),
+                         key=lambda item: -len(item[1]['inbound']))[:5]
+    if most_linked:
+        print(sub_section_heading('Most Linked Pages'))
+        for file, page in most_linked:
+            print(page['url'] + ' (' + file + '): ' + str(len(page['inbound'])) + ' page(s) link here')
+
+    print(sub_section_heading('Broken Internal Links'))
+    if report['broken_links']:
+        for link in report['broken_links']:
+            print(bcolors.FAIL + link['file'] + ': ' + link['href'] + bcolors.RESET)
+    else:
+        print(bcolors.OK + 'Every internal link points to a page of the site.' + bcolors.RESET)
+
+    print(sub_section_heading('Orphan Pages'))
+    if report['orphans']:
+        for file in report['orphans']:
+            print(bcolors.WARNING + report['graph'][file]['url'] + ' (' + file + ')' + bcolors.RESET)
+    else:
+        print(bcolors.OK + 'Every page is linked from another page.' + bcolors.RESET)
+
+    print(sub_section_heading('Link Depth'))
+    depth = report['depth']
+    if depth is None:
+        print(bcolors.WARNING + 'The home page was not found, use --home-url to set its URL.' + bcolors.RESET)
     else:
-        if post.find_all('h1'):
-            get_title = post.find_all('h1')[0]
-            title = get_title.get_text()
+        print('Deepest page: ' + str(depth['max']) + ' click(s) from the home page. Average: ' +
+              str(depth['average']) + '.')
+        for clicks, count in depth['pages_by_depth'].items():
+            print(str(clicks) + ' click(s): ' + str(count) + ' page(s)')
+        color = bcolors.FAIL if depth['deeper_than_3'] else bcolors.OK
+        print(color + 'More than 3 clicks deep: ' + str(depth['deeper_than_3']) + bcolors.RESET)
+        color = bcolors.FAIL if depth['unreachable'] else bcolors.OK
+        print(color + 'Not reachable from the home page: ' + str(depth['unreachable']) + bcolors.RESET)
+    print('\nSEO Behind This Section: Search engines find pages by following links, and pages that no other page links to or that are many clicks from the home page are crawled less often.\nReference(s): https://rankmath.com/kb/score-100-in-tests/#linking-to-internal-resources')
+
+
+def print_duplicates(report):
+    print(section_heading('Duplicate Content'))
+    print(str(report['pages']) + ' page(s) compared at a similarity of ' +
+          str(report['threshold']) + ' or more.')
+    print(sub_section_heading('Near Duplicate Pages'))
+    if not report['clusters']:
+        print(bcolors.OK + 'No pages are near duplicates of each other.' + bcolors.RESET)
+    for number, cluster in enumerate(report['clusters'], 1):
+        print(bcolors.FAIL + 'Group ' + str(number) + ': ' + str(len(cluster['files'])) +
+              ' page(s)' + bcolors.RESET)
+        for pair in cluster['pairs']:
+            print('    ' + ' ~ '.join(pair['files']) + ' (' + str(pair['similarity']) + ')')
+    print(sub_section_heading('Keyword Cannibalization'))
+    if report['cannibalization'] is None:
+        print('Pages that share a focus keyword are only looked for with fm, as with no_fm every page has the same one.')
+    elif not report['cannibalization']:
+        print(bcolors.OK + 'Every focus keyword is targeted by one page.' + bcolors.RESET)
+    for entry in report['cannibalization'] or []:
+        print(bcolors.WARNING + entry['keyword'] + ': ' + str(len(entry['files'])) +
+              ' page(s)' + bcolors.RESET)
+        for file in entry['files']:
+            print('    ' + file)
+    print('\nSEO Behind This Section: Pages with nearly the same content, or that target the same focus keyword, compete with each other in search results and split the links and clicks one page could have had.\nReference(s): https://developers.google.com/search/docs/crawling-indexing/consolidate-duplicate-urls')
+
+
+def print_cache(cache):
+    print(str(cache['hits']) + ' hit(s), ' + str(cache['misses']) + ' miss(es), ' +
+          str(cache['evictions']) + ' old result(s) removed.')
+
+
+def print_link_check(report, batch):
+    print(section_heading('External Link Check'))
+    print(str(report['checked']) + ' external link(s) checked, ' + str(report['cached']) +
+          ' of them verified on an earlier run.')
+    if not report['broken']:
+        print(bcolors.OK + 'Every external link responded.' + bcolors.RESET)
+        return
+    print(bcolors.FAIL + str(len(report['broken'])) + ' external link(s) are broken.' + bcolors.RESET)
+    for link in report['broken']:
+        problem = str(link['status']) if link['status'] else link['error']
+        print(bcolors.FAIL + link['url'] + ': ' + problem + bcolors.RESET)
+        if batch:
+            for file in link['files']:
+                print('    ' + file)
+
 
-    # Get the length of the title
-    title_length = len(title)
-    # For longer titles try to put the keyword in the first 50% of the title string
-    placement_max = title_length/2
-    focus_keyword_title_placement = f'{bcolors.FAIL}The focus keyword does not appear in the title or it is not at the beginning of the title.{bcolors.RESET}'
+PROFILE_SLOWEST = 10
 
+
+def print_profile_table(rows, total_seconds):
+    # rows are (phase, seconds, peak bytes, elements visited).
+    print(f'{"Phase":<26}{"Seconds":>10}{"Peak KiB":>12}{"Elements":>10}')
+    for name, seconds, peak_bytes, elements in rows:
+        print(f'{name:<26}{seconds:>10.4f}{peak_bytes / 1024:>12.1f}{elements:>10}')
+    print(f'{"Total":<26}{total_seconds:>10.4f}')
+
+
+def print_image_asset(asset):
+    if asset['missing']:
+        print(bcolors.FAIL + asset['path'] + ': the file was not found.' + bcolors.RESET)
+        return
+    size = f'{asset["width"]}x{asset["height"]}' if asset['width'] else 'unknown size'
+    description = (asset['path'] + ': ' + (asset['format'] or 'unknown format') + ', ' +
+                   size + ', ' + str(round(asset['bytes'] / 1024)) + ' KB.')
+    problems = []
+    if asset['oversized']:
+        problems.append('It is larger than the limit, compress or resize it.')
+    if not asset['keyword_in_name']:
+        problems.append('The focus keyword is not in the file name.')
+    color = bcolors.FAIL if asset['oversized'] else bcolors.WARNING if problems else bcolors.OK
+    print(color + ' '.join([description] + problems) + bcolors.RESET)
+
+
+def print_report(result):
+    # Prints the section of every check that ran on the document.
+    checks = get_checks()
+    for name in result.checks:
+        if name in checks:
+            checks[name].report(result)
+
+
+def print_title_section(result):
     # The focus keyword should be in the title of the article
-    title_focus_keyword_search = re.search(
-        focus_keyword, title, flags=re.IGNORECASE)
-    if title_focus_keyword_search:
+    title_length = result.title_length
+    if result.keyword_in_title:
         focus_keyword_title_placement = f'{bcolors.OK}The focus keyword is in the title.{bcolors.RESET}'
-    elif title_focus_keyword_search and title_focus_keyword_search.span()[1] <= placement_max:
-        focus_keyword_title_placement = f'{bcolors.OK}The focus keyword is in the title and placed at the beginning.{bcolors.RESET}'
     else:
         focus_keyword_title_placement = f'{bcolors.FAIL}The keyword does not appear in the title.{bcolors.RESET}'
 
     print(section_heading('Title'))
-    print(title)
+    print(result.title)
     if title_length <= 60:
         print(bcolors.OK + 'Length of Title: ' +
               str(title_length) + bcolors.RESET)
@@ -126,44 +3232,21 @@ def main():
     print(focus_keyword_title_placement)
     print('\nSEO Behind This Section: Google typically displays the first 50 - 60 characters and \nstaying under 60 means most of your titles will fully display in SERPs.')
 
-    # SEO best practices recommend that the focus keyword be in the first paragraph of your content
-    get_first_paragraph = post.find_all('p')[0]
-    first_paragraph = get_first_paragraph.get_text()
-
-    # Some of SSGs (Static Site Generators) can use the contents of your first paragraph
-    # as the meta description of your HTML document. The default is to check the first
-    # paragraph for the focus keyword.
-    #if args.front_matter == 'fm':
-    #    meta_description = first_paragraph[0: 160:]
-    if args.front_matter == 'fm' and  args.desc_lookup:
-        meta_description = front_matter[args.desc_lookup.lower()][0]        
-    elif args.front_matter == 'no_fm' and args.desc:
-        meta_description = args.desc
-    else:
-        meta_description = first_paragraph[0: 160:]
 
-    meta_description_length = len(meta_description)
-    focus_keyword_meta_description_placement = 'The focus keyword does not appear in the meta description.'
-    meta_description_keyword_search = re.search(
-        focus_keyword, meta_description, flags=re.IGNORECASE)
-    if meta_description_keyword_search:
+def print_meta_description_section(result):
+    if result.keyword_in_meta_description:
         focus_keyword_meta_description_placement = f'{bcolors.OK}The focus keyword was found in the description or the first paragraph.\nIt will be displayed in the meta description if the SSG uses the first paragraph for this tag.{bcolors.RESET}'
     else:
         focus_keyword_meta_description_placement = 'The focus keyword was not found in the first 160 characters of the description or the first paragraph. (Based on your settings)'
 
     print(section_heading('Meta Description'))
-    print(meta_description)
+    print(result.meta_description)
     print(focus_keyword_meta_description_placement)
     print('\nSEO Behind This Section: The focus keyword should appear in the meta description of the page and be 50 - 160 characters.\nReference(s): https://rankmath.com/kb/score-100-in-tests/#focus-keyword-in-the-meta-description-primary-focus-keyword-only \nand https://moz.com/learn/seo/meta-description')
 
-    # SEO best practices are not clear on what 'Google' considers a good length
-    # for content. I have settled on on a minimum of 300 - 500 words.
-    word_count = 0
-    content = post.find_all('p')
-    for word in content:
-        x = word.get_text()
-        word_count += len(x.split())
 
+def print_word_count_section(result):
+    word_count = result.word_count
     print(section_heading('Word Count'))
     if word_count < 300:
         word_count_summary = 'A ' + \
@@ -181,15 +3264,17 @@ def main():
         print(bcolors.OK + word_count_summary + bcolors.RESET)
     print('\nSEO Behind This Section: SEO best practices are not clear on what Google and other search engines consider a good length for content.\nI have settled on a minimum of 300 - 500 words.\nReference(s): https://rankmath.com/kb/score-100-in-tests/#overall-content-length')
 
+
+def print_keyword_section(result):
+    word_count = result.word_count
     # SEO best practices recommend the number of times your focus keyword appears
     # should between 1 - 1.5% https://rankmath.com/kb/score-100-in-tests/. This script will tell you
     # your result, how many words you should have, how many you have, and the difference.
     focus_keyword_count_target = int(round(word_count * .01, 0))
-    focus_keyword_content_count = len(
-        post(text=re.compile(focus_keyword, re.IGNORECASE)))
-    keyword_density = round(focus_keyword_content_count / word_count, 4)*100
+    focus_keyword_content_count = result.keyword_count
+    keyword_density = result.keyword_density
     keyword_difference = focus_keyword_content_count - focus_keyword_count_target
-    keyword_summary = 'The focus keyword \'' + focus_keyword + '\' has been used ' + \
+    keyword_summary = 'The focus keyword \'' + result.focus_keyword + '\' has been used ' + \
         str(focus_keyword_content_count) + \
         ' times with a keyword density of '+str(keyword_density) + '%.'
 
@@ -214,23 +3299,35 @@ def main():
         print(bcolors.FAIL + keyword_guidance + bcolors.RESET)
     print('\nSEO Behind This Section: It is recommended that your focus keyword should appear between 1 - 1.5%.\nReference(s): https://rankmath.com/kb/score-100-in-tests/#Keyword%20Density%20.')
 
+    # Secondary keywords are reported together so they can be compared at a glance.
+    secondary_keywords = result.keywords[1:]
+    if secondary_keywords:
+        print(section_heading('Secondary Keywords'))
+        for keyword in secondary_keywords:
+            usage = result.keyword_usage[keyword]
+            found_in = [name for name, key in [('title', 'title'), ('meta description', 'meta_description')]
+                        if usage[key]]
+            keyword_summary = '\'' + keyword + '\' has been used ' + str(usage['count']) + \
+                ' times with a keyword density of ' + str(usage['density']) + '%, in ' + \
+                str(usage['images']) + ' image alt tag(s) and ' + \
+                str(usage['headings']) + ' sub-heading(s).'
+            if found_in:
+                keyword_summary += ' Found in the ' + ' and '.join(found_in) + '.'
+            color = bcolors.OK if usage['count'] else bcolors.WARNING
+            print(color + keyword_summary + bcolors.RESET)
+        print('\nSEO Behind This Section: Secondary keywords and related phrases in the title, description, sub-headings and image alt tags help search engines understand the topic of your content.')
+
+
+def print_images_section(result):
     # SEO best practices recommend at least on image be in your content. The image
     # should have the focus keyword in the alt tag and be used in the name of the file.
-    # I have found good Google Search Console results with images. Checking the name
-    # of the file is done visually.
-    get_images = post.find_all('img')
-    image_count = len(get_images)
-    images_with_focus_keyword_in_alt = []
-    images_without_focus_keyword_in_alt = []
-
-    for image in get_images:
-        alt_text = image.get('alt')
-        keyword_in_alt = re.search(
-            focus_keyword, alt_text, flags=re.IGNORECASE)
-        if keyword_in_alt:
-            images_with_focus_keyword_in_alt.append(image)
-        else:
-            images_without_focus_keyword_in_alt.append(image)
+    # I have found good Google Search Console results with images. The name of the
+    # file is checked by --audit-images.
+    image_count = len(result.images)
+    images_with_focus_keyword_in_alt = [
+        image for image in result.images if result.focus_keyword in image['keywords']]
+    images_without_focus_keyword_in_alt = [
+        image for image in result.images if result.focus_keyword not in image['keywords']]
 
     print(section_heading('Images'))
     if image_count >= 1:
@@ -240,31 +3337,28 @@ def main():
         if len(images_with_focus_keyword_in_alt) > 0:
             print(sub_section_heading('Images with keyword in alt tag'))
             for img in images_with_focus_keyword_in_alt:
-                print(bcolors.OK + str(img) + bcolors.RESET)
+                print(bcolors.OK + img['html'] + bcolors.RESET)
         if len(images_without_focus_keyword_in_alt) > 0:
             print(sub_section_heading('Images without the keyword in alt tag'))
             for img in images_without_focus_keyword_in_alt:
-                print(bcolors.WARNING + str(img) + bcolors.RESET)
+                print(bcolors.WARNING + img['html'] + bcolors.RESET)
+        audited_images = [image for image in result.images if 'asset' in image]
+        if audited_images:
+            print(sub_section_heading('Image Files'))
+            for image in audited_images:
+                print_image_asset(image['asset'])
     else:
         print(bcolors.FAIL + 'There are no identifiable images.' + bcolors.RESET)
 
+
+def print_links_section(result):
     # SEO best practices recommend 3 links. This one is easy, but linking to internal
     # content will help improve your sites standing with search engines.
-    links = post.find_all('a')
-    link_count = 0
-    internal_link_count = 0
-    internal_links = []
-    external_link_count = 0
-    external_links = []
-    for link in links:
-        link_count += 1
-        link_url = link.get('href')
-        domain_in_link = re.search(domain, link_url, flags=re.IGNORECASE)
-        if domain_in_link:
-            internal_links.append(link)
-        else:
-            external_links.append(link)
-            external_link_count += 1
+    link_count = len(result.links)
+    internal_links = result.internal_links
+    internal_link_count = len(internal_links)
+    external_links = result.external_links
+    external_link_count = len(external_links)
 
     print(section_heading('Links'))
     if link_count > 0:
@@ -282,7 +3376,7 @@ def main():
               ' internal links exist in your content.\n' + bcolors.RESET)
     if internal_link_count > 0:
         for link in internal_links:
-            print(link)
+            print(link['html'])
 
     print(sub_section_heading('External Links'))
     if external_link_count < 1:
@@ -295,140 +3389,64 @@ def main():
               ' external links exist.\n' + bcolors.RESET)
     if external_link_count > 0:
         for link in external_links:
-            print(link)
+            print(link['html'])
 
+
+def print_structure_section(result):
     # Additional headings help to improve the organization of your content. If you
     # are using h2 - h6 headers place your focus keyword or related keywords for
     # additional search engine juice.
-    other_headings_count = 0
-    h2_with_focus_keyword = []
-    h2_without_focus_keyword = []
-    h3_count = []
-    h3_with_focus_keyword = []
-    h3_without_focus_keyword = []
-    h4_count = []
-    h4_with_focus_keyword = []
-    h4_without_focus_keyword = []
-    h5_count = []
-    h5_with_focus_keyword = []
-    h5_without_focus_keyword = []
-    h6_count = []
-    h6_with_focus_keyword = []
-    h6_without_focus_keyword = []
-
-    h2_list = post.find_all('h2')
-    h2_count = len(h2_list)
-    h3_list = post.find_all('h3')
-    h3_count = len(h3_list)
-    h4_list = post.find_all('h4')
-    h4_count = len(h4_list)
-    h5_list = post.find_all('h5')
-    h5_count = len(h5_list)
-    h6_list = post.find_all('h6')
-    h6_count = len(h6_list)
-
-    for h in h2_list:
-        text = h.get_text()
-        find_keyword = re.search(focus_keyword, text, flags=re.IGNORECASE)
-        if find_keyword:
-            h2_with_focus_keyword.append(text)
-            other_headings_count += 1
-        else:
-            h2_without_focus_keyword.append(text)
-            other_headings_count += 1
-
-    for h in h3_list:
-        text = h.get_text()
-        find_keyword = re.search(focus_keyword, text, flags=re.IGNORECASE)
-        if find_keyword:
-            h3_with_focus_keyword.append(text)
-            other_headings_count += 1
-        else:
-            h3_without_focus_keyword.append(text)
-            other_headings_count += 1
-
-    for h in h4_list:
-        text = h.get_text()
-        find_keyword = re.search(focus_keyword, text, flags=re.IGNORECASE)
-        if find_keyword:
-            h4_with_focus_keyword.append(text)
-            other_headings_count += 1
-        else:
-            h4_without_focus_keyword.append(text)
-            other_headings_count += 1
-
-    for h in h5_list:
-        text = h.get_text()
-        find_keyword = re.search(focus_keyword, text, flags=re.IGNORECASE)
-        if find_keyword:
-            h5_with_focus_keyword.append(text)
-            other_headings_count += 1
-        else:
-            h5_without_focus_keyword.append(text)
-            other_headings_count += 1
-
-    for h in h6_list:
-        text = h.get_text()
-        find_keyword = re.search(focus_keyword, text, flags=re.IGNORECASE)
-        if find_keyword:
-            h6_with_focus_keyword.append(text)
-            other_headings_count += 1
-        else:
-            h6_without_focus_keyword.append(text)
-            other_headings_count += 1
-
-    if other_headings_count > 0:
+    if any(result.headings[level] for level in range(2, 7)):
         print(section_heading('Content Structure'))
         print('\nSEO Behind This Section: Using additional sub-headings helps readers and search engines understand the structure of your content.\nReference(s): https://rankmath.com/kb/score-100-in-tests/#focus-keyword-in-subheading-primary-and-secondary-focus-keywords')
-    if h2_count > 0:
-        if len(h2_with_focus_keyword) > 0:
-            print(sub_section_heading('H2 Heading(s) with Keyword'))
-            for heading in h2_with_focus_keyword:
+    for level in range(2, 7):
+        with_focus_keyword = [heading['text'] for heading in result.headings[level]
+                              if result.focus_keyword in heading['keywords']]
+        without_focus_keyword = [heading['text'] for heading in result.headings[level]
+                                 if result.focus_keyword not in heading['keywords']]
+        if len(with_focus_keyword) > 0:
+            print(sub_section_heading('H' + str(level) + ' Heading(s) with Keyword'))
+            for heading in with_focus_keyword:
                 print(heading)
-        if len(h2_without_focus_keyword) > 0:
-            print(sub_section_heading('H2 Heading(s) without Keyword'))
-            for heading in h2_without_focus_keyword:
+        if len(without_focus_keyword) > 0:
+            print(sub_section_heading('H' + str(level) + ' Heading(s) without Keyword'))
+            for heading in without_focus_keyword:
                 print(heading)
 
-    if h3_count > 0:
-        if len(h3_with_focus_keyword) > 0:
-            print(sub_section_heading('H3 Heading(s) with Keyword'))
-            for heading in h3_with_focus_keyword:
-                print(heading)
-        if len(h3_without_focus_keyword) > 0:
-            print(sub_section_heading('H3 Heading(s) without Keyword'))
-            for heading in h3_without_focus_keyword:
-                print(heading)
 
-    if h4_count > 0:
-        if len(h4_with_focus_keyword) > 0:
-            print(sub_section_heading('H4 Heading(s) with Keyword'))
-            for heading in h4_with_focus_keyword:
-                print(heading)
-        if len(h4_without_focus_keyword) > 0:
-            print(sub_section_heading('H4 Heading(s) without Keyword'))
-            for heading in h4_without_focus_keyword:
-                print(heading)
+READING_EASE_LEVELS = [(90, 'very easy'), (80, 'easy'), (70, 'fairly easy'),
+                       (60, 'plain English'), (50, 'fairly difficult'), (30, 'difficult')]
 
-    if h5_count > 0:
-        if len(h5_with_focus_keyword) > 0:
-            print(sub_section_heading('H5 Heading(s) with Keyword'))
-            for heading in h5_with_focus_keyword:
-                print(heading)
-        if len(h5_without_focus_keyword) > 0:
-            print(sub_section_heading('H5 Heading(s) without Keyword'))
-            for heading in h5_without_focus_keyword:
-                print(heading)
 
-    if h6_count > 0:
-        if len(h6_with_focus_keyword) > 0:
-            print(sub_section_heading('H6 Heading(s) with Keyword'))
-            for heading in h6_with_focus_keyword:
-                print(heading)
-        if len(h6_without_focus_keyword) > 0:
-            print(sub_section_heading('H6 Heading(s) without Keyword'))
-            for heading in h6_without_focus_keyword:
-                print(heading)
+def print_readability_section(result):
+    # Short sentences and paragraphs keep readers on the page. The Flesch Reading
+    # Ease goes from 0 (very difficult) to 100 (very easy); 60 - 70 is plain English.
+    readability = result.readability
+    print(section_heading('Readability'))
+    if not readability['words']:
+        print(bcolors.WARNING + 'There are no paragraphs to score.' + bcolors.RESET)
+        return
+    ease = readability['flesch_reading_ease']
+    level = next((name for minimum, name in READING_EASE_LEVELS if ease >= minimum), 'very difficult')
+    color = bcolors.OK if ease >= 60 else bcolors.WARNING if ease >= 30 else bcolors.FAIL
+    print(color + 'Flesch Reading Ease: ' + str(ease) + ' (' + level + ').' + bcolors.RESET)
+    print('Flesch-Kincaid grade level: ' + str(readability['flesch_kincaid_grade']) + '.')
+
+    sentences = readability['sentence_length']
+    print(str(readability['sentences']) + ' sentence(s) of ' + str(sentences['average']) +
+          ' words on average. The longest has ' + str(sentences['longest']) + ' words.')
+    share = sentences['long'] / readability['sentences']
+    color = bcolors.FAIL if share > .25 else bcolors.OK
+    print(color + str(sentences['long']) + ' sentence(s) (' + str(round(share * 100)) +
+          '%) are longer than ' + str(LONG_SENTENCE_WORDS) + ' words.' + bcolors.RESET)
+
+    paragraphs = readability['paragraph_length']
+    print(str(readability['paragraphs']) + ' paragraph(s) of ' + str(paragraphs['average']) +
+          ' words on average. The longest has ' + str(paragraphs['longest']) + ' words.')
+    color = bcolors.WARNING if paragraphs['long'] else bcolors.OK
+    print(color + str(paragraphs['long']) + ' paragraph(s) are longer than ' +
+          str(LONG_PARAGRAPH_WORDS) + ' words.' + bcolors.RESET)
+    print('\nSEO Behind This Section: Content that is easy to read keeps visitors on the page longer. Aim for a Flesch Reading Ease of 60 or more, at most a quarter of sentences longer than 20 words and paragraphs under 150 words.\nReference(s): https://en.wikipedia.org/wiki/Flesch%E2%80%93Kincaid_readability_tests')
 
 
 if __name__ == '__main__':
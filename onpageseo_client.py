@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+# A thin client for a running 'onpageseo.py --serve'. It takes the same arguments
+# as onpageseo.py, sends them to the server and prints the report. Only the
+# standard library is imported so every call starts quickly.
+#
+# Usage: onpageseo_client.py [--connect ADDRESS] FILE DOMAIN {fm,no_fm} ...
+
+import json
+import os
+import socket
+import sys
+import tempfile
+
+
+def default_server_address():
+    return os.path.join(tempfile.gettempdir(), 'onpageseo-' + str(os.getuid()) + '.sock')
+
+
+def connect(address):
+    # 'HOST:PORT' or ':PORT' is a TCP address, anything else a Unix socket path.
+    host, separator, port = address.rpartition(':')
+    if separator and port.isdigit() and os.sep not in address:
+        return socket.create_connection((host.strip('[]') or '127.0.0.1', int(port)))
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(address)
+    return client
+
+
+def main():
+    argv = sys.argv[1:]
+    address = os.environ.get('ONPAGESEO_ADDRESS') or default_server_address()
+    if argv[:1] == ['--connect'] and len(argv) > 1:
+        address = argv[1]
+        argv = argv[2:]
+
+    request = json.dumps({'argv': argv, 'cwd': os.getcwd()})
+    try:
+        with connect(address) as client:
+            client.sendall(request.encode('utf-8') + b'\n')
+            response = b''.join(iter(lambda: client.recv(65536), b''))
+    except OSError as e:
+        sys.exit(f'Unable to reach the onpageseo server at {address}: {e}\n'
+                 'Start it with: ./onpageseo.py --serve')
+
+    response = json.loads(response)
+    sys.stdout.write(response['output'])
+    sys.exit(response['status'])
+
+
+if __name__ == '__main__':
+    main()
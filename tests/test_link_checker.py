@@ -0,0 +1,149 @@
+# Checks the --check-links stage against a stand-in HTTP server on the loopback
+# interface, so no real network is needed.
+#
+# Usage: python -m unittest tests.test_link_checker (or python -m pytest tests)
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import onpageseo  # noqa: E402
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Every request is recorded as (method, path, client port) so the tests can
+    # see which requests were made and on how many connections.
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.respond()
+
+    def do_GET(self):
+        self.respond()
+
+    def respond(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, self.client_address[1]))
+            hits = sum(1 for method, path, port in server.requests if path == self.path)
+        headers = {}
+        if self.path == '/ok':
+            status = 200
+        elif self.path == '/no-head':
+            status = 405 if self.command == 'HEAD' else 200
+        elif self.path == '/moved':
+            status, headers = 301, {'Location': '/ok'}
+        elif self.path == '/loop':
+            status, headers = 302, {'Location': '/loop'}
+        elif self.path == '/flaky':
+            # Fails until it has been asked three times.
+            status = 503 if hits < 3 else 200
+        else:
+            status = 404
+        body = b'' if self.command == 'HEAD' else b'stand-in'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LinkCheckerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.base = 'http://127.0.0.1:' + str(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def check(self, *paths, retries=2):
+        checker = onpageseo.LinkChecker(per_host=1, timeout=5, retries=retries, retry_delay=0)
+        outcomes = checker.check([self.base + path for path in paths])
+        return {url[len(self.base):]: outcome for url, outcome in outcomes.items()}
+
+    def methods(self, path):
+        return [method for method, requested, port in self.server.requests if requested == path]
+
+    def test_working_link(self):
+        self.assertEqual(self.check('/ok'), {'/ok': {'status': 200, 'error': None}})
+        self.assertEqual(self.methods('/ok'), ['HEAD'])
+
+    def test_falls_back_to_get_when_head_is_not_allowed(self):
+        self.assertEqual(self.check('/no-head')['/no-head']['status'], 200)
+        self.assertEqual(self.methods('/no-head'), ['HEAD', 'GET'])
+
+    def test_follows_redirects(self):
+        self.assertEqual(self.check('/moved')['/moved']['status'], 200)
+        self.assertEqual(self.methods('/ok'), ['HEAD'])
+
+    def test_stops_following_a_redirect_loop(self):
+        outcome = self.check('/loop')['/loop']
+        self.assertIsNone(outcome['status'])
+        self.assertIn('Too many redirects', outcome['error'])
+
+    def test_retries_server_errors(self):
+        self.assertEqual(self.check('/flaky')['/flaky']['status'], 200)
+        self.assertEqual(len(self.methods('/flaky')), 3)
+
+    def test_gives_up_after_the_last_retry(self):
+        self.assertEqual(self.check('/flaky', retries=1)['/flaky']['status'], 503)
+        self.assertEqual(len(self.methods('/flaky')), 2)
+
+    def test_does_not_retry_a_missing_page(self):
+        self.assertEqual(self.check('/missing')['/missing']['status'], 404)
+        self.assertEqual(self.methods('/missing'), ['HEAD'])
+
+    def test_reuses_keep_alive_connections(self):
+        outcomes = self.check('/ok', '/no-head', '/moved', '/missing')
+        self.assertEqual(len(outcomes), 4)
+        self.assertEqual(len({port for method, path, port in self.server.requests}), 1)
+
+    def test_working_links_are_cached_until_the_ttl_passes(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            args = argparse.Namespace(
+                no_cache=False, cache_dir=cache_dir, link_cache_ttl=24, link_concurrency=4,
+                host_concurrency=1, link_timeout=5, link_retries=0)
+            urls = {self.base + '/ok': ['a.md'], self.base + '/missing': ['a.md', 'b.md']}
+            first = onpageseo.check_links(args, urls)
+            self.assertEqual((first['checked'], first['cached'], first['ok']), (2, 0, 1))
+            self.assertEqual(first['broken'], [{'url': self.base + '/missing', 'status': 404,
+                                                'error': None, 'files': ['a.md', 'b.md']}])
+
+            # The working link is served from the cache, the broken one checked again.
+            second = onpageseo.check_links(args, urls)
+            self.assertEqual((second['checked'], second['cached'], second['ok']), (2, 1, 1))
+            self.assertEqual(self.methods('/ok'), ['HEAD'])
+            self.assertEqual(self.methods('/missing'), ['HEAD', 'HEAD'])
+
+            # Once the entry is older than the TTL the link is checked again.
+            path = os.path.join(cache_dir, 'links.json')
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                entries = json.load(cache_file)
+            for entry in entries.values():
+                entry['checked'] -= 25 * 60 * 60
+            with open(path, 'w', encoding='utf-8') as cache_file:
+                json.dump(entries, cache_file)
+            third = onpageseo.check_links(args, urls)
+            self.assertEqual(third['cached'], 0)
+            self.assertEqual(self.methods('/ok'), ['HEAD', 'HEAD'])
+
+
+if __name__ == '__main__':
+    unittest.main()